@@ -6,6 +6,7 @@ that matches the iOS frontend.
 """
 
 import sys
+from collections import defaultdict
 from pathlib import Path
 
 # Add src to path
@@ -18,6 +19,71 @@ import structlog
 
 logger = structlog.get_logger()
 
+# Map old achievement types to new ones where possible
+TYPE_MAPPING = {
+    "document_upload": "upload_document"
+}
+
+
+def _load_all_achievements(db) -> dict:
+    """Read every user's achievements in one collection group query, keyed by user id."""
+    achievements_by_user = defaultdict(dict)
+    for doc in db.collection_group("achievements").stream():
+        user_ref = doc.reference.parent.parent
+        if user_ref is None or user_ref.parent.id != "users":
+            continue
+        achievements_by_user[user_ref.id][doc.id] = doc.to_dict()
+    return achievements_by_user
+
+
+def _migrate_one_user(db, bulk_writer, user_id: str, old_achievements: dict) -> bool:
+    """Queue the achievement rewrite for one user; returns True on success."""
+
+    logger.info(f"Processing user {user_id}")
+
+    try:
+        achievements_ref = db.collection(f"users/{user_id}/achievements")
+
+        # Get new default achievements
+        new_achievements = create_default_achievements()
+
+        # Update achievements
+        for new_ach in new_achievements:
+            ach_type = new_ach.type.value
+            old_type = TYPE_MAPPING.get(ach_type, ach_type)
+
+            # Check if old achievement exists
+            if old_type in old_achievements:
+                old_ach = old_achievements[old_type]
+
+                # Preserve progress and unlock status
+                new_ach_data = new_ach.model_dump()
+                new_ach_data["progress"] = old_ach.get("progress", 0)
+                new_ach_data["unlocked_at"] = old_ach.get("unlocked_at")
+
+                # Set the achievement
+                bulk_writer.set(achievements_ref.document(ach_type), new_ach_data)
+
+                # Delete old achievement if type changed
+                if old_type != ach_type:
+                    bulk_writer.delete(achievements_ref.document(old_type))
+            else:
+                # New achievement - just create it
+                bulk_writer.set(achievements_ref.document(ach_type), new_ach.model_dump())
+
+        # Delete any obsolete achievements
+        obsolete_types = set(old_achievements.keys()) - {ach.type.value for ach in new_achievements} - {"document_upload"}
+        for obsolete_type in obsolete_types:
+            bulk_writer.delete(achievements_ref.document(obsolete_type))
+            logger.info(f"Deleted obsolete achievement: {obsolete_type}")
+
+        logger.info(f"Updated achievements for user {user_id}")
+        return True
+
+    except Exception as e:
+        logger.error(f"Failed to update user {user_id}: {str(e)}")
+        return False
+
 
 def migrate_achievements():
     """Migrate all users to new achievement structure."""
@@ -33,68 +99,26 @@ def migrate_achievements():
     except:
         pass
 
-    # List all users
-    page = auth.list_users()
-    all_users = list(page.users)
+    # List all users across every page (list_users alone returns only the first 1000)
+    user_ids = [user.uid for user in auth.list_users().iterate_all()]
 
-    user_count = 0
-    updated_count = 0
+    # Prefetch current achievements with one streamed query instead of one per user,
+    # so the per-user step below does no network I/O
+    achievements_by_user = _load_all_achievements(db)
 
-    for user in all_users:
-        user_id = user.uid
-        user_count += 1
+    # One BulkWriter for the whole run; it sends its batches in parallel itself
+    bulk_writer = db.bulk_writer()
 
-        logger.info(f"Processing user {user_id}")
+    # Queue users one at a time: BulkWriter is not thread-safe, and threads would add nothing
+    results = [
+        _migrate_one_user(db, bulk_writer, user_id, achievements_by_user.get(user_id, {}))
+        for user_id in user_ids
+    ]
 
-        try:
-            # Get current achievements
-            achievements_ref = db.collection(f"users/{user_id}/achievements")
-            old_achievements = {doc.id: doc.to_dict() for doc in achievements_ref.stream()}
-
-            # Get new default achievements
-            new_achievements = create_default_achievements()
-
-            # Map old achievement types to new ones where possible
-            type_mapping = {
-                "document_upload": "upload_document"
-            }
-
-            # Update achievements
-            for new_ach in new_achievements:
-                ach_type = new_ach.type.value
-                old_type = type_mapping.get(ach_type, ach_type)
-
-                # Check if old achievement exists
-                if old_type in old_achievements:
-                    old_ach = old_achievements[old_type]
-
-                    # Preserve progress and unlock status
-                    new_ach_data = new_ach.model_dump()
-                    new_ach_data["progress"] = old_ach.get("progress", 0)
-                    new_ach_data["unlocked_at"] = old_ach.get("unlocked_at")
-
-                    # Set the achievement
-                    achievements_ref.document(ach_type).set(new_ach_data)
-
-                    # Delete old achievement if type changed
-                    if old_type != ach_type:
-                        achievements_ref.document(old_type).delete()
-                else:
-                    # New achievement - just create it
-                    achievements_ref.document(ach_type).set(new_ach.model_dump())
-
-            # Delete any obsolete achievements
-            obsolete_types = set(old_achievements.keys()) - {ach.type.value for ach in new_achievements} - {"document_upload"}
-            for obsolete_type in obsolete_types:
-                achievements_ref.document(obsolete_type).delete()
-                logger.info(f"Deleted obsolete achievement: {obsolete_type}")
-
-            updated_count += 1
-            logger.info(f"Updated achievements for user {user_id}")
-
-        except Exception as e:
-            logger.error(f"Failed to update user {user_id}: {str(e)}")
-            continue
+    bulk_writer.close()  # Flushes remaining writes
+
+    user_count = len(results)
+    updated_count = sum(results)
 
     logger.info(f"Migration complete! Processed {user_count} users, updated {updated_count} users")
 
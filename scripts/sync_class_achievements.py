@@ -30,25 +30,16 @@ async def sync_class_achievements(user_id: str):
     print(f"User {user_id} has {class_count} classes")
 
     if class_count > 0:
-        # Get current stats
+        # Set the count to match actual classes in one write; merge keeps the other
+        # stats and creates the document if it is missing
         stats_ref = db.collection(f"users/{user_id}/stats").document("main")
-        stats_doc = stats_ref.get()
+        stats_ref.set({"classes_created": class_count}, merge=True)
+        print(f"Updated classes_created to {class_count}")
 
-        if stats_doc.exists:
-            stats = stats_doc.to_dict() or {}
-            current_count = stats.get("classes_created", 0)
-            print(f"Current classes_created stat: {current_count}")
-
-            # Update to match actual class count
-            stats["classes_created"] = class_count
-            stats_ref.set(stats)
-            print(f"Updated classes_created to {class_count}")
-
-            # Trigger achievement check
-            await user_service._check_achievements(user_id, stats)
-            print("Achievement check triggered")
-        else:
-            print("Stats document doesn't exist!")
+        # Trigger achievement check against the full stats, which other progress depends on
+        stats = stats_ref.get().to_dict() or {}
+        await user_service._check_achievements(user_id, stats)
+        print("Achievement check triggered")
     else:
         print("No classes found")
 
@@ -27,10 +27,10 @@ class DopplerConfig:
                 value = os.getenv(key, default)
                 if value and key.lower() in ['openai_api_key', 'api_key']:
                     # Log that we're using user-provided API key (secure)
-                    logger.info(f"Using user-provided API key for {key}")
+                    logger.info("Using user-provided API key", key=key)
                 return value
         except Exception as e:
-            logger.warning(f"Failed to retrieve secret {key}: {e}")
+            logger.warning("Failed to retrieve secret", key=key, error=str(e))
             return default
 
     def is_production(self) -> bool:
@@ -2,6 +2,7 @@
 
 import os
 from enum import Enum
+from functools import lru_cache
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -59,6 +60,20 @@ class Settings(BaseSettings):
     embedding_model: str = Field(
         default="text-embedding-3-small", description="Embedding model to use"
     )
+    embedding_batch_size: int = Field(
+        default=1000, description="Texts sent per embeddings API request", ge=1, le=2048
+    )
+    embedding_max_retries: int = Field(
+        default=5, description="Retries for failed embeddings API requests", ge=0, le=10
+    )
+    embedding_cache_dir: str | None = Field(
+        default=None, description="Directory for a persistent SHA-256 keyed chunk embedding cache (None disables it)"
+    )
+    embedding_dimensions: int | None = Field(
+        default=None,
+        description="Truncated embedding size for text-embedding-3 models (None keeps the native size; changing it requires re-ingesting documents)",
+        ge=64,
+    )
     chat_temperature: float = Field(
         default=0.0, description="LLM temperature", ge=0.0, le=2.0
     )
@@ -76,6 +91,9 @@ class Settings(BaseSettings):
     naming_temperature: float = Field(
         default=0.3, description="Temperature for chat naming (slight creativity)", ge=0.0, le=1.0
     )
+    naming_timeout: float = Field(
+        default=5.0, description="Seconds to wait for a chat name before using the truncated question", gt=0
+    )
 
     # Memory Management Configuration
     memory_max_token_limit: int = Field(
@@ -84,6 +102,19 @@ class Settings(BaseSettings):
     memory_summary_model: str = Field(
         default="gpt-3.5-turbo", description="Model for conversation summarization (cost optimization)"
     )
+    firestore_vector_search: bool = Field(
+        default=False,
+        description="Use Firestore find_nearest for class-filtered search (requires a composite vector index on chunks)",
+    )
+    reranker_model: str | None = Field(
+        default=None, description="Optional cross-encoder model used to rerank retrieved chunks (e.g. BAAI/bge-reranker-base)"
+    )
+    rerank_candidates: int = Field(
+        default=20, description="Number of chunks retrieved for the reranker to choose from", ge=1, le=100
+    )
+    context_token_budget: int = Field(
+        default=4000, description="Token budget for retrieved context sent to the LLM", ge=500, le=32000
+    )
 
     # LangChain Document Processing
     chunk_size: int = Field(
@@ -92,6 +123,12 @@ class Settings(BaseSettings):
     chunk_overlap: int = Field(
         default=200, description="Chunk overlap size", ge=0, le=500
     )
+    parse_workers: int = Field(
+        default=2, description="Worker processes for parsing uploads (0 parses in a thread)", ge=0, le=16
+    )
+    max_upload_bytes: int = Field(
+        default=50 * 1024 * 1024, description="Largest accepted document upload in bytes", ge=1
+    )
 
     # Google Cloud (for Firebase Auth and Firestore Vector Store)
     google_cloud_project: str = Field(
@@ -107,6 +144,12 @@ class Settings(BaseSettings):
     )
     api_prefix: str = Field(default="/api/v1", description="API prefix")
     cors_origins: list[str] = Field(default=["*"], description="CORS allowed origins")
+    upload_concurrency: int = Field(
+        default=8, description="Uploads processed at once per worker; extra requests wait", ge=1
+    )
+    chat_concurrency: int = Field(
+        default=64, description="Chat requests generating at once per worker; extra requests wait", ge=1
+    )
 
     # Authentication (Secure via Doppler)
     jwt_secret_key: str = Field(
@@ -126,6 +169,7 @@ class Settings(BaseSettings):
     log_format: str = Field(default="json", description="Log format (json or text)")
 
 
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
     """Get cached settings instance."""
     return Settings()
\ No newline at end of file
@@ -7,7 +7,7 @@ import structlog
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
 from rag_scholar.config.settings import Settings, get_settings
 from rag_scholar.utils.logging import setup_logging
@@ -27,11 +27,12 @@ async def lifespan(app: FastAPI):
     global settings, services
 
     try:
-        # Initialize settings first
+        # Initialize settings first; get_settings() is cached, so routes reuse this instance
         logger.info("Initializing application settings...")
         settings = get_settings()
 
-        # LangChain services are initialized per-request for optimal performance
+        # Pipelines are built per request on top of process-wide cached clients,
+        # vector stores and splitters, so there is nothing to load eagerly here
         logger.info("Application services ready (LangChain per-request initialization)")
 
         logger.info(
@@ -47,6 +48,9 @@ async def lifespan(app: FastAPI):
         logger.info("Shutting down RAG Scholar API")
         services.clear()
 
+        from rag_scholar.services.http_clients import close_http_clients
+        await close_http_clients()
+
 
 def create_app() -> FastAPI:
     """Create and configure FastAPI application."""
@@ -58,6 +62,7 @@ def create_app() -> FastAPI:
         version="2.0.0",
         description="Professional RAG-based research assistant API",
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,  # orjson serializes responses in Rust
         docs_url="/api/v1/docs",  # Use default, will work with most configs
         redoc_url="/api/v1/redoc",
     )
@@ -110,9 +115,9 @@ def create_app() -> FastAPI:
 
     # Exception handlers
     @app.exception_handler(Exception)
-    async def general_exception_handler(request: Any, exc: Exception) -> JSONResponse:  # noqa: ARG001
+    async def general_exception_handler(request: Any, exc: Exception) -> ORJSONResponse:  # noqa: ARG001
         logger.error("Unhandled exception", exc_info=exc)
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={"detail": "Internal server error"},
         )
@@ -138,6 +143,9 @@ def run() -> None:
         port=int(os.getenv("PORT", 8080)),
         reload=settings.debug if settings else False,
         log_level=settings.log_level.lower() if settings else "info",
+        # C event loop and HTTP parser (both ship with uvicorn[standard])
+        loop="uvloop",
+        http="httptools",
     )
 
 
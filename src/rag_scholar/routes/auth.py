@@ -6,8 +6,7 @@ from pydantic import BaseModel
 from typing import Optional
 
 from ..services.firebase_auth import verify_firebase_token
-from ..services.user_profile import UserProfileService
-from ..config.settings import get_settings
+from ..services.user_profile import UserProfileService, get_user_profile_service
 
 logger = structlog.get_logger()
 router = APIRouter(tags=["authentication"])
@@ -53,10 +52,11 @@ async def get_current_user(authorization: str | None = Header(None)) -> dict:
 
 
 @router.get("/me")
-async def get_current_user_info(current_user: dict = Depends(get_current_user)):
+async def get_current_user_info(
+    current_user: dict = Depends(get_current_user),
+    user_service: UserProfileService = Depends(get_user_profile_service),
+):
     """Get current user information with full profile."""
-    settings = get_settings()
-    user_service = UserProfileService(settings)
 
     logger.info("Fetching user profile", user_id=current_user["id"])
 
@@ -99,10 +99,11 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
 
 
 @router.post("/grant-early-adopter")
-async def grant_early_adopter(current_user: dict = Depends(get_current_user)):
+async def grant_early_adopter(
+    current_user: dict = Depends(get_current_user),
+    user_service: UserProfileService = Depends(get_user_profile_service),
+):
     """Grant early adopter status to current user (temporary endpoint)."""
-    settings = get_settings()
-    user_service = UserProfileService(settings)
 
     success = await user_service.update_user_stats(current_user["id"], "is_early_adopter", 1)
 
@@ -113,12 +114,12 @@ async def grant_early_adopter(current_user: dict = Depends(get_current_user)):
 
 
 @router.get("/api-settings", response_model=UserAPISettings)
-async def get_api_settings(current_user: dict = Depends(get_current_user)):
+async def get_api_settings(
+    current_user: dict = Depends(get_current_user),
+    user_service: UserProfileService = Depends(get_user_profile_service),
+):
     """Get user's API settings."""
     try:
-        settings = get_settings()
-        user_service = UserProfileService(settings)
-
         # Get API settings from user profile
         api_settings = await user_service.get_user_api_settings(current_user["id"])
 
@@ -138,13 +139,11 @@ async def get_api_settings(current_user: dict = Depends(get_current_user)):
 @router.post("/api-settings")
 async def update_api_settings(
     api_settings: UserAPISettings,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    user_service: UserProfileService = Depends(get_user_profile_service),
 ):
     """Update user's API settings."""
     try:
-        settings = get_settings()
-        user_service = UserProfileService(settings)
-
         # Update API settings in user profile
         success = await user_service.update_user_api_settings(
             current_user["id"],
@@ -172,13 +171,11 @@ async def update_api_settings(
 @router.put("/profile")
 async def update_user_profile(
     profile_data: UserProfileUpdate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    user_service: UserProfileService = Depends(get_user_profile_service),
 ):
     """Update user profile information."""
     try:
-        settings = get_settings()
-        user_service = UserProfileService(settings)
-
         # Convert the profile data to dict and remove None values
         update_data = {k: v for k, v in profile_data.model_dump().items() if v is not None}
 
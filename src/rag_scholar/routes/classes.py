@@ -3,11 +3,12 @@
 import structlog
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from typing import List, Optional
 
 from .auth import get_current_user
 from ..config.settings import get_settings
+from ..utils.logging import DEBUG_DETAILS
 
 logger = structlog.get_logger()
 
@@ -38,6 +39,10 @@ class ClassResponse(BaseModel):
     updated_at: Optional[str] = None
 
 
+# Validates a whole class listing in one call instead of one model construction per class
+_CLASS_LIST_ADAPTER = TypeAdapter(List[ClassResponse])
+
+
 @router.get("/", response_model=List[ClassResponse])
 async def get_user_classes(current_user: dict = Depends(get_current_user)):
     """Get all classes for the current user."""
@@ -56,21 +61,23 @@ async def get_user_classes(current_user: dict = Depends(get_current_user)):
         classes = []
         for doc in classes_docs:
             data = doc.to_dict()
-            classes.append(ClassResponse(
-                id=doc.id,
-                name=data.get("name", ""),
-                domain_type=data.get("domain_type", "general"),
-                description=data.get("description", ""),
-                created_at=data.get("created_at") if "created_at" in data else None,
-                updated_at=data.get("updated_at") if "updated_at" in data else None
-            ))
+            classes.append({
+                "id": doc.id,
+                "name": data.get("name", ""),
+                "domain_type": data.get("domain_type", "general"),
+                "description": data.get("description", ""),
+                "created_at": data.get("created_at"),
+                "updated_at": data.get("updated_at"),
+            })
+        classes = _CLASS_LIST_ADAPTER.validate_python(classes)
 
         logger.info("Classes retrieved from database",
                    user_id=current_user["id"],
                    class_count=len(classes))
-        logger.debug("Class list details",
-                    user_id=current_user["id"],
-                    classes=[{"id": c.id, "name": c.name, "domain_type": c.domain_type} for c in classes])
+        if DEBUG_DETAILS:
+            logger.debug("Class list details",
+                        user_id=current_user["id"],
+                        classes=[{"id": c.id, "name": c.name, "domain_type": c.domain_type} for c in classes])
 
         return classes
 
@@ -108,8 +115,8 @@ async def create_class(
 
         # Track class creation for achievements
         try:
-            from ..services.user_profile import UserProfileService
-            user_service = UserProfileService(settings)
+            from ..services.user_profile import get_user_profile_service
+            user_service = get_user_profile_service()
             success = await user_service.update_user_stats(current_user["id"], "classes_created", 1)
             logger.info("Class creation achievement tracked",
                        user_id=current_user["id"],
@@ -1,14 +1,18 @@
 """Document management endpoints using LangChain."""
 
+import asyncio
 import structlog
+from functools import lru_cache
 from fastapi import APIRouter, Depends, File, Form, UploadFile, HTTPException
 from pydantic import BaseModel
 from typing import Optional
 
 from rag_scholar.services.langchain_ingestion import LangChainIngestionPipeline
-from rag_scholar.services.user_profile import UserProfileService
-from rag_scholar.services.storage import DocumentStorageService
+from rag_scholar.services.query_cache import QueryCache
+from rag_scholar.services.user_profile import UserProfileService, get_user_profile_service
+from rag_scholar.services.storage import DocumentStorageService, get_storage_service
 from rag_scholar.config.settings import get_settings
+from rag_scholar.utils.logging import DEBUG_DETAILS
 
 from .auth import get_current_user
 
@@ -16,6 +20,28 @@ logger = structlog.get_logger()
 
 router = APIRouter()
 
+# Extensions accepted by /upload
+ALLOWED_UPLOAD_EXTENSIONS = frozenset({".pdf", ".txt", ".md", ".docx"})
+
+# Chunk lookups in flight at once while listing documents
+CHUNK_LOOKUP_CONCURRENCY = 10
+
+# Document listings keyed by (user_id, collection); the list is fetched on every
+# page render but only changes on upload, delete or class assignment. Invalidation
+# only reaches this worker, so the TTL bounds staleness on the other workers/instances
+_documents_cache = QueryCache(max_size=1024, ttl=5)
+
+
+@lru_cache(maxsize=1)
+def _upload_semaphore() -> asyncio.Semaphore:
+    """Per-worker cap on uploads being parsed, embedded and stored at once."""
+    return asyncio.Semaphore(get_settings().upload_concurrency)
+
+
+def _invalidate_documents_cache(user_id: str) -> None:
+    """Drop cached document listings for a user after their documents change."""
+    _documents_cache.invalidate(lambda key: key[0] == user_id)
+
 
 class UploadResponse(BaseModel):
     """Document upload response."""
@@ -26,142 +52,203 @@ class UploadResponse(BaseModel):
     message: str
 
 
+async def _store_upload(
+    storage_service: DocumentStorageService,
+    settings,
+    user_id: str,
+    document_id: str,
+    file: UploadFile,
+    file_extension: str,
+    preview_task: Optional[asyncio.Task],
+) -> None:
+    """Upload the original and its preview to Firebase Storage and record the URLs."""
+    try:
+        # Determine content type
+        content_type = "application/pdf" if file_extension == ".pdf" else "application/octet-stream"
+
+        # Upload original document, streamed from the upload's spooled file
+        upload_original = storage_service.upload_document(
+            file_content=file.file,
+            filename=file.filename,
+            user_id=user_id,
+            document_id=document_id,
+            content_type=content_type
+        )
+
+        async def upload_preview() -> tuple[str, str]:
+            preview_content = await preview_task if preview_task else None
+            if not preview_content:
+                return "", ""
+            return await storage_service.upload_preview(
+                preview_content=preview_content,
+                user_id=user_id,
+                document_id=document_id,
+                content_type="application/pdf"
+            )
+
+        (storage_url, download_url), (preview_url, preview_download_url) = await asyncio.gather(
+            upload_original, upload_preview()
+        )
+
+        # Update document metadata in Firestore with storage URLs
+        from google.cloud import firestore
+        db = firestore.Client(project=settings.google_cloud_project)
+        doc_ref = db.collection(f"users/{user_id}/documents").document(document_id)
+        await asyncio.to_thread(doc_ref.update, {
+            "storage_url": storage_url,
+            "download_url": download_url,
+            "preview_url": preview_url,
+            "preview_download_url": preview_download_url,
+        })
+
+        logger.info("Uploaded document to storage",
+                   user_id=user_id,
+                   document_id=document_id,
+                   has_preview=bool(preview_url))
+
+    except Exception as e:
+        # Don't fail the entire upload if storage fails
+        logger.warning("Failed to upload to Firebase Storage",
+                      user_id=user_id,
+                      document_id=document_id,
+                      error=str(e))
+
+
+async def _record_upload_stats(user_service: UserProfileService, user_id: str) -> None:
+    """Count the upload towards the user's achievements without failing the upload."""
+    try:
+        await user_service.update_user_stats(user_id, "documents_uploaded", 1)
+        logger.info("Updated document upload achievement", user_id=user_id)
+    except Exception as e:
+        logger.warning("Failed to update achievement", user_id=user_id, error=str(e))
+
+
 @router.post("/upload", response_model=UploadResponse)
 async def upload_document(
     file: UploadFile = File(...),
     collection: str = Form("database"),
     current_user: dict = Depends(get_current_user),
+    user_service: UserProfileService = Depends(get_user_profile_service),
+    storage_service: DocumentStorageService = Depends(get_storage_service),
 ):
     """Upload and process document using LangChain ingestion - API key fetched securely from user profile."""
 
     # Validate file type
-    allowed_types = {".pdf", ".txt", ".md", ".docx"}
     file_extension = f".{file.filename.split('.')[-1].lower()}" if file.filename else ""
 
-    if file_extension not in allowed_types:
+    if file_extension not in ALLOWED_UPLOAD_EXTENSIONS:
         raise HTTPException(
             status_code=400,
-            detail=f"File type {file_extension} not supported. Allowed: {', '.join(allowed_types)}"
+            detail=f"File type {file_extension} not supported. Allowed: {', '.join(sorted(ALLOWED_UPLOAD_EXTENSIONS))}"
         )
 
-    try:
-        # Initialize services
-        settings = get_settings()
-        user_service = UserProfileService(settings)
-
-        # Fetch user's API key securely from Firestore
-        api_settings = await user_service.get_user_api_settings(current_user["id"])
-        user_api_key = api_settings.get("api_key")
+    # Reject oversized uploads before reading, parsing or storing anything
+    max_upload_bytes = get_settings().max_upload_bytes
+    if file.size is not None and file.size > max_upload_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size is {max_upload_bytes // (1024 * 1024)} MB"
+        )
 
-        if not user_api_key:
-            raise HTTPException(
-                status_code=400,
-                detail="API key required. Please configure your API key in Advanced Settings."
-            )
+    # Admitted uploads hold the slot through parsing, embedding and storage
+    async with _upload_semaphore():
+        try:
+            # Initialize services
+            settings = get_settings()
 
-        logger.info("Upload request received - using secure API key from Firestore",
-                    user_id=current_user["id"],
-                    api_key_suffix=user_api_key[-4:] if len(user_api_key) > 4 else "none")
+            # Fetch user's API key securely from Firestore
+            api_settings = await user_service.get_user_api_settings(current_user["id"])
+            user_api_key = api_settings.get("api_key")
 
-        # Create custom settings with user's API key
-        user_settings = settings.model_copy()
-        user_settings.openai_api_key = user_api_key
+            if not user_api_key:
+                raise HTTPException(
+                    status_code=400,
+                    detail="API key required. Please configure your API key in Advanced Settings."
+                )
 
-        ingestion_pipeline = LangChainIngestionPipeline(user_settings)
+            logger.info("Upload request received - using secure API key from Firestore",
+                        user_id=current_user["id"],
+                        api_key_suffix=user_api_key[-4:] if len(user_api_key) > 4 else "none")
 
-        # Read file content
-        file_content = await file.read()
-        file_size = len(file_content)  # Get file size in bytes
+            # Create custom settings with user's API key
+            user_settings = settings.model_copy()
+            user_settings.openai_api_key = user_api_key
 
-        logger.info("Processing document upload",
-                    user_id=current_user["id"],
-                    filename=file.filename,
-                    file_size_bytes=file_size,
-                    file_size_mb=round(file_size / (1024 * 1024), 2))
+            ingestion_pipeline = LangChainIngestionPipeline(user_settings)
 
-        # Process with LangChain ingestion
-        result = await ingestion_pipeline.ingest_document(
-            file_content=file_content,
-            filename=file.filename,
-            collection=collection,
-            metadata={
-                "uploaded_by": current_user["id"],
-                "user_email": current_user.get("email", ""),
-                "file_size_bytes": file_size,
-            }
-        )
+            # Read file content
+            file_content = await file.read()
+            file_size = len(file_content)  # Get file size in bytes
 
-        # Upload to Firebase Storage for iOS preview
-        document_id = result.get("document_id", "")
-        storage_service = DocumentStorageService(settings)
+            logger.info("Processing document upload",
+                        user_id=current_user["id"],
+                        filename=file.filename,
+                        file_size_bytes=file_size,
+                        file_size_mb=round(file_size / (1024 * 1024), 2))
+
+            # The PDF preview only needs the raw bytes, so render it while ingestion runs
+            preview_task = (
+                asyncio.create_task(storage_service.generate_pdf_preview(file_content))
+                if file_extension == ".pdf" else None
+            )
 
-        try:
-            # Determine content type
-            content_type = "application/pdf" if file_extension == ".pdf" else "application/octet-stream"
-
-            # Upload original document
-            storage_url, download_url = await storage_service.upload_document(
-                file_content=file_content,
-                filename=file.filename,
-                user_id=current_user["id"],
-                document_id=document_id,
-                content_type=content_type
+            # Process with LangChain ingestion
+            try:
+                result = await ingestion_pipeline.ingest_document(
+                    file_content=file_content,
+                    filename=file.filename,
+                    collection=collection,
+                    metadata={
+                        "uploaded_by": current_user["id"],
+                        "user_email": current_user.get("email", ""),
+                        "file_size_bytes": file_size,
+                    }
+                )
+            except BaseException:
+                if preview_task:
+                    preview_task.cancel()
+                raise
+
+            # Same content was already ingested; storage and stats are already up to date
+            if result.get("status") == "duplicate":
+                if preview_task:
+                    preview_task.cancel()
+                return UploadResponse(
+                    id=result.get("document_id", ""),
+                    filename=file.filename or "",
+                    collection=collection,
+                    status="duplicate",
+                    message="Document already uploaded; reusing existing document"
+                )
+
+            # Storage uploads and the achievement update are independent; run them together
+            document_id = result.get("document_id", "")
+            await asyncio.gather(
+                _store_upload(
+                    storage_service,
+                    settings,
+                    user_id=current_user["id"],
+                    document_id=document_id,
+                    file=file,
+                    file_extension=file_extension,
+                    preview_task=preview_task,
+                ),
+                _record_upload_stats(user_service, current_user["id"]),
             )
 
-            # Generate and upload preview for PDFs
-            preview_url = ""
-            preview_download_url = ""
-            if file_extension == ".pdf":
-                preview_content = await storage_service.generate_pdf_preview(file_content)
-                if preview_content:
-                    preview_url, preview_download_url = await storage_service.upload_preview(
-                        preview_content=preview_content,
-                        user_id=current_user["id"],
-                        document_id=document_id,
-                        content_type="application/pdf"
-                    )
-
-            # Update document metadata in Firestore with storage URLs
-            from google.cloud import firestore
-            db = firestore.Client(project=settings.google_cloud_project)
-            doc_ref = db.collection(f"users/{current_user['id']}/documents").document(document_id)
-            doc_ref.update({
-                "storage_url": storage_url,
-                "download_url": download_url,
-                "preview_url": preview_url,
-                "preview_download_url": preview_download_url,
-            })
-
-            logger.info("Uploaded document to storage",
-                       user_id=current_user["id"],
-                       document_id=document_id,
-                       has_preview=bool(preview_url))
+            # New document and its storage URLs are written; drop stale listings
+            _invalidate_documents_cache(current_user["id"])
 
-        except Exception as e:
-            # Don't fail the entire upload if storage fails
-            logger.warning("Failed to upload to Firebase Storage",
-                          user_id=current_user["id"],
-                          document_id=document_id,
-                          error=str(e))
+            return UploadResponse(
+                id=result.get("document_id", ""),
+                filename=file.filename or "",
+                collection=collection,
+                status="processed",
+                message="Document uploaded and processed successfully"
+            )
 
-        # Update user achievements for document upload
-        try:
-            user_service = UserProfileService(settings)
-            await user_service.update_user_stats(current_user["id"], "documents_uploaded", 1)
-            logger.info("Updated document upload achievement", user_id=current_user["id"])
         except Exception as e:
-            logger.warning("Failed to update achievement", user_id=current_user["id"], error=str(e))
-
-        return UploadResponse(
-            id=result.get("document_id", ""),
-            filename=file.filename or "",
-            collection=collection,
-            status="processed",
-            message="Document uploaded and processed successfully"
-        )
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 
 @router.delete("/{document_id}")
@@ -195,6 +282,7 @@ async def delete_document(
             user_id=current_user["id"],
             document_ids=[document_id]
         )
+        _invalidate_documents_cache(current_user["id"])
 
         if success:
             return {"message": "Document deleted successfully"}
@@ -254,6 +342,7 @@ async def assign_document_to_class(
             class_id=request.class_id,
             operation=request.operation
         )
+        _invalidate_documents_cache(current_user["id"])
 
         if success:
             return {
@@ -278,6 +367,11 @@ async def get_documents(
     user_id = current_user["id"]
     logger.info("Fetching documents", user_id=user_id, collection=collection)
 
+    cache_key = (user_id, collection)
+    cached = _documents_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
         # Get documents from user's documents subcollection (no API key needed for reading)
         settings = get_settings()
@@ -292,30 +386,33 @@ async def get_documents(
                        user_id=user_id,
                        document_count=len(docs))
 
-            documents = []
-            for doc in docs:
-                data = doc.to_dict()
-                filename = data.get("filename", "unknown")
+            # Get actual assigned_classes from vector store chunks, one query per document;
+            # the queries are independent, so overlap them with a bounded number in flight
+            chunks_ref = db.collection(f"users/{user_id}/chunks")
+            lookup_slots = asyncio.Semaphore(CHUNK_LOOKUP_CONCURRENCY)
 
-                # Get actual assigned_classes from vector store chunks
-                chunks_ref = db.collection(f"users/{user_id}/chunks")
-                chunks_query = chunks_ref.where("metadata.source", "==", filename).limit(1)
-                chunks = chunks_query.get()
+            async def fetch_assigned_classes(filename: str) -> list:
+                query = chunks_ref.where("metadata.source", "==", filename).select(["metadata.assigned_classes"]).limit(1)
+                async with lookup_slots:
+                    chunks = await asyncio.to_thread(query.get)
 
                 logger.debug("Chunks retrieved for document",
                             user_id=user_id,
                             filename=filename,
                             chunks_found=len(chunks))
 
-                assigned_classes = []
-                if chunks:
-                    chunk_data = chunks[0].to_dict()
-                    assigned_classes = chunk_data.get("metadata", {}).get("assigned_classes", [])
-                    logger.debug("Chunk metadata retrieved",
-                                user_id=user_id,
-                                filename=filename,
-                                assigned_classes=assigned_classes)
+                if not chunks:
+                    return []
+                return chunks[0].to_dict().get("metadata", {}).get("assigned_classes", [])
 
+            doc_data = [doc.to_dict() for doc in docs]
+            classes_per_doc = await asyncio.gather(*(
+                fetch_assigned_classes(data.get("filename", "unknown")) for data in doc_data
+            ))
+
+            documents = []
+            for doc, data, assigned_classes in zip(docs, doc_data, classes_per_doc):
+                filename = data.get("filename", "unknown")
                 documents.append({
                     "id": data.get("document_id", doc.id),
                     "filename": filename,
@@ -334,9 +431,11 @@ async def get_documents(
             logger.info("Returning documents",
                        user_id=user_id,
                        document_count=len(documents))
-            logger.debug("Document list details",
-                        user_id=user_id,
-                        documents=[{"id": d["id"], "filename": d["filename"], "chunks": d["chunks"]} for d in documents])
+            if DEBUG_DETAILS:
+                logger.debug("Document list details",
+                            user_id=user_id,
+                            documents=[{"id": d["id"], "filename": d["filename"], "chunks": d["chunks"]} for d in documents])
+            _documents_cache.set(cache_key, documents)
             return documents
         except Exception as e:
             logger.error("Failed to get documents", user_id=user_id, error=str(e))
@@ -1,22 +1,41 @@
 """RAG Scholar chat endpoints using LangChain."""
 
+import asyncio
+import orjson
 import uuid
 import structlog
-from fastapi import APIRouter, Depends, HTTPException
+from functools import lru_cache
+from typing import AsyncIterator
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from rag_scholar.services.langchain_pipeline import LangChainRAGPipeline
 from rag_scholar.services.langchain_ingestion import LangChainIngestionPipeline
-from rag_scholar.services.langchain_citations import extract_citations_from_response, is_meaningful_query, is_conversational_query
+from rag_scholar.services.langchain_citations import extract_citations_from_response, is_meaningful_query, is_conversational_query, is_background_query
 from rag_scholar.services.langchain_tools import generate_conversational_response
-from rag_scholar.services.user_profile import UserProfileService
+from rag_scholar.services.user_profile import get_user_profile_service
+from rag_scholar.services.session_cache import session_names
 from rag_scholar.config.settings import get_settings
 
 from .auth import get_current_user
 
+try:
+    from fastapi.sse import EventSourceResponse
+except ImportError:  # FastAPI releases before fastapi.sse
+    EventSourceResponse = StreamingResponse
+
 logger = structlog.get_logger()
 router = APIRouter()
 
+# Keep proxies (nginx, Cloud Run front ends) from buffering streamed tokens
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+# Comment frame sent after SSE_PING_INTERVAL seconds without an event, so idle streams
+# (slow retrieval, long tool calls) are not closed by proxies and load balancers
+SSE_PING = b": ping\n\n"
+SSE_PING_INTERVAL = 15.0
+
 
 class ChatRequest(BaseModel):
     """RAG Scholar chat request."""
@@ -40,21 +59,14 @@ class ChatResponse(BaseModel):
     chat_name: str | None = None
 
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat(
-    request: ChatRequest,
-    current_user: dict = Depends(get_current_user),
-) -> ChatResponse:
-    """Full RAG Scholar chat with document retrieval, citations, and background mode support."""
+@lru_cache(maxsize=1)
+def _chat_semaphore() -> asyncio.Semaphore:
+    """Per-worker cap on chats doing retrieval and generation at once."""
+    return asyncio.Semaphore(get_settings().chat_concurrency)
 
-    logger.info("Processing chat request",
-               user_id=current_user["id"],
-               session_id=request.session_id,
-               class_id=request.class_id,
-               query_length=len(request.query))
 
-    # Initialize services with user's API key if provided
-    settings = get_settings()
+def _build_user_settings(request: ChatRequest, settings):
+    """Copy settings with the user's API key and model preferences applied."""
 
     # Use user's API key if provided, otherwise fall back to environment
     user_api_key = request.api_key or settings.openai_api_key
@@ -74,33 +86,123 @@ async def chat(
         user_settings.llm_model = request.model
 
     # Temperature and max_tokens come from user's frontend settings
-    if hasattr(request, 'temperature') and request.temperature is not None:
+    if request.temperature is not None:
         user_settings.chat_temperature = request.temperature
-    if hasattr(request, 'max_tokens') and request.max_tokens is not None:
+    if request.max_tokens is not None:
         user_settings.max_tokens = request.max_tokens
 
+    return user_settings
+
+
+async def _track_chat_achievements(user_id: str, domain_type: str | None, sources_count: int) -> None:
+    """Update chat stats and achievements without failing the chat."""
+    try:
+        user_service = get_user_profile_service()
+        await user_service.update_user_stats(user_id, "total_chats", 1)
+
+        # Track daily activity for streak
+        await user_service.track_daily_activity(user_id)
+
+        # Track time-based achievements (early bird, night owl)
+        await user_service.track_time_based_achievements(user_id)
+
+        # Track domain exploration if domain_type is provided
+        if domain_type:
+            await user_service.track_domain_exploration(user_id, domain_type)
+
+        # Track citations if sources were returned
+        if sources_count > 0:
+            await user_service.update_user_stats(user_id, "citations_received", sources_count)
+
+        logger.info("User stats updated successfully", user_id=user_id)
+    except Exception as e:
+        # Don't fail the chat if achievement tracking fails
+        logger.warning("Achievement tracking failed", user_id=user_id, error=str(e))
+
+
+def _sse(payload: dict) -> bytes:
+    """Encode a payload as a server-sent event frame."""
+    return b"data: " + orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS) + b"\n\n"
+
+
+async def _sse_frames(payloads: AsyncIterator[dict], ping_interval: float) -> AsyncIterator[bytes]:
+    """Encode payloads as SSE frames, sending a ping comment whenever the source goes quiet."""
+    iterator = payloads.__aiter__()
+    pending = asyncio.ensure_future(iterator.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait({pending}, timeout=ping_interval)
+            if not done:
+                yield SSE_PING
+                continue
+            try:
+                payload = pending.result()
+            except StopAsyncIteration:
+                return
+            yield _sse(payload)
+            pending = asyncio.ensure_future(iterator.__anext__())
+    finally:
+        pending.cancel()
+
+
+def _sse_response(payloads: AsyncIterator[dict], ping_interval: float = SSE_PING_INTERVAL) -> EventSourceResponse:
+    """Stream payload dicts as server-sent events with anti-buffering headers and keep-alive pings."""
+    # EventSourceResponse only encodes events itself for generator path operations; as a
+    # returned response it streams bytes like StreamingResponse, so both get encoded frames
+    return EventSourceResponse(
+        _sse_frames(payloads, ping_interval),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(
+    request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user),
+) -> ChatResponse:
+    """Full RAG Scholar chat with document retrieval, citations, and background mode support."""
+
+    user_id = current_user["id"]
+    session_id = request.session_id or str(uuid.uuid4())
+    logger.info("Processing chat request",
+               user_id=user_id,
+               session_id=request.session_id,
+               class_id=request.class_id,
+               query_length=len(request.query))
+
+    # Initialize services with user's API key if provided
+    settings = get_settings()
+    user_settings = _build_user_settings(request, settings)
+
     rag_pipeline = LangChainRAGPipeline(user_settings)
     ingestion_pipeline = LangChainIngestionPipeline(user_settings)
 
     # Handle conversational queries (greetings, simple interactions) without citations
     if is_conversational_query(request.query):
         conversational_response = generate_conversational_response(request.query)
-        session_id = request.session_id or str(uuid.uuid4())
 
-        # Store session metadata for conversational interactions
-        try:
-            generated_name = await rag_pipeline._store_session_metadata(
-                user_id=current_user["id"],
-                session_id=session_id,
-                class_id=request.class_id,
-                question=request.query,
-                response=conversational_response,
-                class_name=request.class_name,
-                domain_type=request.domain_type
-            )
-        except Exception:
+        # No LLM naming for canned replies, so the name is known up front: the cached
+        # name, or the placeholder a new session gets. None lets clients keep theirs.
+        cached_session = session_names.get((user_id, session_id))
+        generated_name = cached_session[0] if cached_session else None
+        if generated_name is None and not request.session_id:
             generated_name = request.query[:40] + "..." if len(request.query) > 40 else request.query
 
+        # Session bookkeeping happens after the response is sent
+        background_tasks.add_task(
+            rag_pipeline._store_session_metadata,
+            user_id=user_id,
+            session_id=session_id,
+            class_id=request.class_id,
+            question=request.query,
+            response=conversational_response,
+            class_name=request.class_name,
+            domain_type=request.domain_type,
+            generate_name=False,  # Canned reply; don't spend an LLM call naming a greeting
+        )
+
         return {
             "response": conversational_response,
             "sources": [],
@@ -117,47 +219,46 @@ async def chat(
             "sources": [],
             "citations": [],
             "grouped_sources": [],
-            "session_id": request.session_id or str(uuid.uuid4()),
+            "session_id": session_id,
         }
 
-    # Generate session ID if not provided
-    session_id = request.session_id or str(uuid.uuid4())
-
-    # Retrieve relevant documents using LangChain ingestion pipeline
-    context_docs = []
-    if request.query:
-        logger.info("Searching for relevant documents",
-                   user_id=current_user["id"],
-                   class_id=request.class_id,
-                   k=request.k)
-
-        search_results = await ingestion_pipeline.search_documents(
-            query=request.query,
-            user_id=current_user["id"],
+    async with _chat_semaphore():
+        # Retrieve relevant documents using LangChain ingestion pipeline
+        # (/background answers from general knowledge, so skip retrieval entirely)
+        context_docs = []
+        if request.query and not is_background_query(request.query):
+            logger.info("Searching for relevant documents",
+                       user_id=user_id,
+                       class_id=request.class_id,
+                       k=request.k)
+
+            search_results = await ingestion_pipeline.search_documents(
+                query=request.query,
+                user_id=user_id,
+                class_id=request.class_id,
+                k=request.k,
+            )
+            # Preserve all search result data including score and metadata fields
+            context_docs = search_results
+
+            logger.info("Document search completed",
+                       user_id=user_id,
+                       documents_found=len(context_docs))
+
+        # Chat with RAG pipeline
+        logger.info("Generating chat response",
+                   user_id=user_id,
+                   session_id=session_id)
+
+        result = await rag_pipeline.chat_with_history(
+            question=request.query,
+            context_docs=context_docs,
+            session_id=session_id,
+            user_id=user_id,
             class_id=request.class_id,
-            k=request.k,
+            class_name=request.class_name,
+            domain_type=request.domain_type,
         )
-        # Preserve all search result data including score and metadata fields
-        context_docs = search_results
-
-        logger.info("Document search completed",
-                   user_id=current_user["id"],
-                   documents_found=len(context_docs))
-
-    # Chat with RAG pipeline
-    logger.info("Generating chat response",
-               user_id=current_user["id"],
-               session_id=session_id)
-
-    result = await rag_pipeline.chat_with_history(
-        question=request.query,
-        context_docs=context_docs,
-        session_id=session_id,
-        user_id=current_user["id"],
-        class_id=request.class_id,
-        class_name=request.class_name,
-        domain_type=request.domain_type,
-    )
 
     # Enhanced citation processing - use context_docs from pipeline result if available
     pipeline_context_docs = result.get("context_docs", context_docs)
@@ -177,35 +278,108 @@ async def chat(
     sources_count = len(result.get("sources", []))
 
     logger.info("Chat response generated",
-               user_id=current_user["id"],
+               user_id=user_id,
                session_id=session_id,
                sources_count=sources_count,
                response_length=len(result.get("response", "")))
 
-    # Update user achievements for chat
-    try:
-        user_service = UserProfileService(settings)
-        await user_service.update_user_stats(current_user["id"], "total_chats", 1)
+    # Update user achievements for chat after the response has been sent
+    background_tasks.add_task(_track_chat_achievements, user_id, request.domain_type, sources_count)
 
-        # Track daily activity for streak
-        await user_service.track_daily_activity(current_user["id"])
+    return ChatResponse(**result)
 
-        # Track time-based achievements (early bird, night owl)
-        await user_service.track_time_based_achievements(current_user["id"])
 
-        # Track domain exploration if domain_type is provided
-        if request.domain_type:
-            await user_service.track_domain_exploration(current_user["id"], request.domain_type)
+@router.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user),
+) -> EventSourceResponse:
+    """Stream a RAG Scholar chat response as server-sent events."""
 
-        # Track citations if sources were returned
-        if sources_count > 0:
-            await user_service.update_user_stats(current_user["id"], "citations_received", sources_count)
+    settings = get_settings()
+    user_settings = _build_user_settings(request, settings)
+    user_id = current_user["id"]
+    session_id = request.session_id or str(uuid.uuid4())
 
-        logger.info("User stats updated successfully", user_id=current_user["id"])
-    except Exception as e:
-        # Don't fail the chat if achievement tracking fails
-        logger.warning("Achievement tracking failed", user_id=current_user["id"], error=str(e))
+    rag_pipeline = LangChainRAGPipeline(user_settings)
+    ingestion_pipeline = LangChainIngestionPipeline(user_settings)
 
-    return ChatResponse(**result)
+    async def generate():
+        chunks = []
+        context_docs = []
+        conversational = is_conversational_query(request.query)
+        try:
+            if conversational:
+                chunks.append(generate_conversational_response(request.query))
+                yield {"type": "token", "content": chunks[0]}
+            elif not is_meaningful_query(request.query):
+                yield {"type": "token", "content": "I didn't understand your question. Could you rephrase?"}
+                yield {"type": "done", "session_id": session_id, "sources": []}
+                return
+            else:
+                # The slot is held only while retrieval and the LLM stream are open; it is
+                # released before post-processing so a slow reader cannot pin it
+                async with _chat_semaphore():
+                    if not is_background_query(request.query):
+                        context_docs = rag_pipeline.fit_context_budget(
+                            await ingestion_pipeline.search_documents(
+                                query=request.query,
+                                user_id=user_id,
+                                class_id=request.class_id,
+                                k=request.k,
+                            )
+                        )
+                    async for chunk in rag_pipeline.stream_chat_with_history(
+                        question=request.query,
+                        context_docs=context_docs,
+                        session_id=session_id,
+                        user_id=user_id,
+                    ):
+                        chunks.append(chunk)
+                        yield {"type": "token", "content": chunk}
+
+            response_content = "".join(chunks)
+            chat_name = await rag_pipeline._store_session_metadata(
+                user_id=user_id,
+                session_id=session_id,
+                class_id=request.class_id,
+                question=request.query,
+                response=response_content,
+                class_name=request.class_name,
+                domain_type=request.domain_type,
+                generate_name=not conversational,
+            )
+            done_event = {
+                "type": "done",
+                "session_id": session_id,
+                "chat_name": chat_name,
+                "sources": [doc.get("source", "Unknown") for doc in context_docs],
+            }
+
+            # Citation processing needs the full answer, so it runs once over the buffer
+            if response_content and context_docs:
+                enhanced_result = extract_citations_from_response(
+                    text=response_content,
+                    context_docs=context_docs
+                )
+                done_event.update({
+                    "response": enhanced_result["response"],
+                    "citations": enhanced_result["citations"],
+                    "grouped_sources": enhanced_result["grouped_sources"],
+                    "sources": enhanced_result["sources"],
+                })
+
+            # Runs after the response body is sent
+            background_tasks.add_task(
+                _track_chat_achievements, user_id, request.domain_type, len(done_event["sources"])
+            )
+            yield done_event
+
+        except Exception as e:
+            logger.error("Chat stream failed", user_id=user_id, session_id=session_id, error=str(e))
+            yield {"type": "error", "detail": "I'm sorry, I encountered an error processing your message."}
+
+    return _sse_response(generate())
 
 
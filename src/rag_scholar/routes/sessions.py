@@ -1,12 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timezone
+import json
 import uuid
 import structlog
 
 from .auth import get_current_user
 from ..config.settings import get_settings
+from ..services.session_cache import forget_session, session_lists
+from ..utils.logging import DEBUG_DETAILS
 
 logger = structlog.get_logger()
 router = APIRouter()
@@ -22,18 +26,36 @@ class SessionResponse(BaseModel):
     class_name: Optional[str] = None  # Human-readable class name
     domain: Optional[str] = None      # Domain type like "law", "science", "history", etc.
 
+def _message_preview(raw_message) -> Optional[str]:
+    """Preview of a stored chat history message, if it is the user's."""
+    try:
+        message = json.loads(raw_message.decode() if isinstance(raw_message, bytes) else raw_message)
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+    if not isinstance(message, dict) or message.get("type") != "human":
+        return None
+    content = message.get("content", "")
+    if not isinstance(content, str):
+        return None
+    return content[:50] + "..." if len(content) > 50 else content
+
 @router.get("/sessions", response_model=List[SessionResponse])
 async def get_user_sessions(current_user: dict = Depends(get_current_user)):
     """Get all chat sessions for the current user using LangChain's structure"""
+    user_id = current_user["id"]
+    cached = session_lists.get(user_id)
+    if cached is not None:
+        return cached
+
     try:
         from google.cloud import firestore
         settings = get_settings()
         db = firestore.Client(project=settings.google_cloud_project)
-        user_id = current_user["id"]
 
         logger.info("Fetching chat sessions", user_id=user_id)
 
-        # LangChain stores sessions as subcollections: users/{user_id}/chat_sessions/{session_id}/messages
+        # One query returns every session document, chat history and metadata together
         sessions_ref = db.collection(f"users/{user_id}/chat_sessions")
         session_docs = sessions_ref.stream()
 
@@ -43,51 +65,15 @@ async def get_user_sessions(current_user: dict = Depends(get_current_user)):
         logger.info("Chat sessions retrieved from database",
                    user_id=user_id,
                    session_count=len(session_docs_list))
-        print(f"DEBUG SESSIONS: Found {len(session_docs_list)} session documents")
 
         for session_doc in session_docs_list:
             session_id = session_doc.id
             session_data = session_doc.to_dict()
 
-            # Use LangChain's FirestoreChatMessageHistory to get messages correctly
-            try:
-                from langchain_google_firestore import FirestoreChatMessageHistory
-                history = FirestoreChatMessageHistory(
-                    session_id=session_id,
-                    collection=f"users/{user_id}/chat_sessions"
-                )
-                messages = history.messages
-            except Exception as e:
-                print(f"DEBUG: Error using LangChain history for {session_id}: {e}")
-                # Fallback to manual query
-                messages_ref = sessions_ref.document(session_id).collection("messages")
-                try:
-                    # Try ordering by timestamp first
-                    messages = list(messages_ref.order_by("timestamp").limit(5).stream())
-                except:
-                    try:
-                        # Try without ordering if timestamp field doesn't exist
-                        messages = list(messages_ref.limit(5).stream())
-                    except:
-                        messages = []
-
-            print(f"DEBUG: Session {session_id} has {len(messages)} messages")
-
-            # Get first message for preview
-            preview = None
-            if messages:
-                if hasattr(messages[0], 'content'):
-                    # LangChain message object
-                    first_msg = messages[0]
-                    if hasattr(first_msg, 'type') and first_msg.type == "human":
-                        content = first_msg.content
-                        preview = content[:50] + "..." if len(content) > 50 else content
-                else:
-                    # Firestore document (fallback)
-                    first_msg = messages[0].to_dict() if hasattr(messages[0], 'to_dict') else messages[0]
-                    if first_msg.get("type") == "human":
-                        content = first_msg.get("data", {}).get("content", "")
-                        preview = content[:50] + "..." if len(content) > 50 else content
+            # FirestoreChatMessageHistory keeps the messages on this same document,
+            # so count and preview come from the streamed data without a read per session
+            messages = session_data.get("messages", [])
+            preview = _message_preview(messages[0]) if messages else None
 
             # Use session metadata if available, otherwise create from session ID
             name = session_data.get("name", f"Chat {session_id[:8]}")
@@ -113,18 +99,19 @@ async def get_user_sessions(current_user: dict = Depends(get_current_user)):
         logger.info("Returning chat sessions",
                    user_id=user_id,
                    session_count=len(session_list))
-        logger.debug("Session list details",
-                    user_id=user_id,
-                    sessions=[{"id": s.id, "name": s.name, "message_count": s.message_count} for s in session_list])
+        if DEBUG_DETAILS:
+            logger.debug("Session list details",
+                        user_id=user_id,
+                        sessions=[{"id": s.id, "name": s.name, "message_count": s.message_count} for s in session_list])
 
+        session_lists.set(user_id, session_list)
         return session_list
 
     except Exception as e:
         logger.error("Error getting sessions", user_id=user_id, error=str(e))
-        print(f"DEBUG: Error getting sessions: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get sessions: {str(e)}")
 
-@router.get("/sessions/{session_id}/messages")
+@router.get("/sessions/{session_id}/messages", response_class=ORJSONResponse)
 async def get_session_messages(
     session_id: str,
     current_user: dict = Depends(get_current_user)
@@ -217,7 +204,9 @@ async def get_session_messages(
                    session_id=session_id,
                    returned_message_count=len(message_list))
 
-        return {"messages": message_list}
+        # Returning the response directly skips jsonable_encoder's walk over every
+        # message and citation; the payload is already plain JSON types
+        return ORJSONResponse({"messages": message_list})
 
     except Exception as e:
         logger.error("Error getting session messages",
@@ -245,6 +234,7 @@ async def update_session(
             "name": data.get("name"),
             "updated_at": datetime.now(timezone.utc).isoformat()
         })
+        forget_session(user_id, session_id)
 
         return {"id": session_id, "name": data.get("name")}
 
@@ -276,6 +266,7 @@ async def delete_session(
 
         # Delete the session document itself
         session_ref.delete()
+        forget_session(user_id, session_id)
 
         return {"message": "Session deleted successfully"}
 
@@ -2,9 +2,12 @@
 
 import re
 from typing import List, Dict, Any, Tuple
-from sentence_transformers import SentenceTransformer
 import numpy as np
 
+# Claim text followed by its [#n] marker, and bare [#n] markers
+CLAIM_CITATION_RE = re.compile(r'([^.]*?)\s*\[#(\d+)\]', re.ASCII)
+CITATION_RE = re.compile(r'\[#(\d+)\]', re.ASCII)
+
 
 class CitationValidator:
     """Validates and corrects citations using semantic similarity."""
@@ -14,6 +17,8 @@ class CitationValidator:
         self.model = None
         if enable_semantic_validation:
             try:
+                # Imported here so torch stays out of API cold start
+                from sentence_transformers import SentenceTransformer
                 self.model = SentenceTransformer('all-MiniLM-L6-v2')
             except Exception:
                 self.model = None
@@ -39,8 +44,7 @@ class CitationValidator:
             return response_text, []
 
         # Extract citations and their surrounding context
-        citation_pattern = re.compile(r'([^.]*?)\s*\[#(\d+)\]')
-        matches = citation_pattern.findall(response_text)
+        matches = CLAIM_CITATION_RE.findall(response_text)
 
         valid_citations = []
         corrections = []
@@ -128,21 +132,21 @@ class CitationValidator:
         )
 
         # Extract remaining valid citations
-        citation_pattern = re.compile(r'\\[#(\\d+)\\]')
-        citation_matches = citation_pattern.findall(corrected_text)
-        citation_ids = [int(match) for match in citation_matches]
+        citation_ids = dict.fromkeys(map(int, CITATION_RE.findall(corrected_text)))
+
+        # First validation per citation number, for O(1) lookup below
+        validations_by_id = {}
+        for validation in validations:
+            validations_by_id.setdefault(int(validation['citation_num']), validation)
 
         # Build citation list
         citations = []
-        for cite_id in set(citation_ids):
+        for cite_id in citation_ids:
             if cite_id <= len(context_docs):
                 doc = context_docs[cite_id - 1]
 
                 # Find validation info for this citation
-                validation_info = next(
-                    (v for v in validations if int(v['citation_num']) == cite_id),
-                    {'similarity': 1.0, 'valid': True}
-                )
+                validation_info = validations_by_id.get(cite_id, {'similarity': 1.0, 'valid': True})
 
                 citation = {
                     "id": cite_id,
@@ -170,37 +174,12 @@ class CitationValidator:
 
     def _create_preview(self, content: str, max_length: int = 150) -> str:
         """Create a clean preview of content."""
-        if not content:
-            return ""
-
-        # Clean up content
-        cleaned = re.sub(r'\\s+', ' ', content.strip())
-
-        if len(cleaned) <= max_length:
-            return cleaned
+        from .langchain_citations import _create_preview
 
-        # Find last complete sentence within limit
-        truncated = cleaned[:max_length]
-        last_sentence = truncated.rfind('.')
-
-        if last_sentence > max_length * 0.5:
-            return truncated[:last_sentence + 1]
-
-        return truncated + "..."
+        return _create_preview(content, max_length)
 
     def _extract_document_type(self, source: str) -> str:
         """Extract document type from source filename."""
-        if not source:
-            return "document"
-
-        source_lower = source.lower()
-        if source_lower.endswith('.pdf'):
-            return "pdf"
-        elif source_lower.endswith(('.doc', '.docx')):
-            return "doc"
-        elif source_lower.endswith(('.txt', '.md')):
-            return "text"
-        elif source_lower.endswith(('.html', '.htm')):
-            return "html"
-        else:
-            return "document"
\ No newline at end of file
+        from .langchain_citations import _extract_document_type
+
+        return _extract_document_type(source)
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""SQLite-backed byte store for persistent chunk embedding caching."""
+
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+from langchain_core.stores import ByteStore
+
+
+def embedding_cache_key(namespace: str, text: str) -> str:
+    """Content key for an embedding: SHA-256 of the model namespace and text."""
+    return hashlib.sha256(f"{namespace}\0{text}".encode("utf-8")).hexdigest()
+
+
+def encode_float16(vector: Sequence[float]) -> bytes:
+    """Pack an embedding as float16 bytes, half the size of float32."""
+    return np.asarray(vector, dtype=np.float16).tobytes()
+
+
+def decode_float16(value: bytes) -> list[float]:
+    """Unpack float16 bytes back into a float32-precision list."""
+    return np.frombuffer(value, dtype=np.float16).astype(np.float32).tolist()
+
+
+class SQLiteByteStore(ByteStore):
+    """Key/value byte store in a single SQLite file (WAL mode), safe to share across threads."""
+
+    def __init__(self, path: str | Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+            self._conn.commit()
+
+    def mget(self, keys: Sequence[str]) -> list[Optional[bytes]]:
+        """Return values for keys in order, None for missing keys."""
+        if not keys:
+            return []
+
+        found = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM kv WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+        return [found.get(key) for key in keys]
+
+    def mset(self, key_value_pairs: Sequence[tuple[str, bytes]]) -> None:
+        """Insert or replace key/value pairs in one transaction."""
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)", key_value_pairs)
+            self._conn.commit()
+
+    def mdelete(self, keys: Sequence[str]) -> None:
+        """Delete keys, ignoring ones that are missing."""
+        with self._lock:
+            self._conn.executemany("DELETE FROM kv WHERE key = ?", [(key,) for key in keys])
+            self._conn.commit()
+
+    def yield_keys(self, *, prefix: Optional[str] = None) -> Iterator[str]:
+        """Yield stored keys, optionally only those starting with prefix."""
+        with self._lock:
+            if prefix:
+                rows = self._conn.execute(
+                    "SELECT key FROM kv WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+                ).fetchall()
+            else:
+                rows = self._conn.execute("SELECT key FROM kv").fetchall()
+        for (key,) in rows:
+            yield key
@@ -0,0 +1,32 @@
+"""Process-wide pooled HTTP clients for OpenAI-backed LangChain models."""
+
+from functools import lru_cache
+
+import httpx
+
+# Connection pool shared by every OpenAI client in the process; HTTP/2 lets
+# concurrent requests multiplex over one TLS connection
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+
+@lru_cache(maxsize=1)
+def get_http_client() -> httpx.Client:
+    """Shared sync client, used by LangChain calls that run in worker threads."""
+    return httpx.Client(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+
+
+@lru_cache(maxsize=1)
+def get_async_http_client() -> httpx.AsyncClient:
+    """Shared async client for the server's event loop."""
+    return httpx.AsyncClient(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+
+
+async def close_http_clients() -> None:
+    """Close the shared clients if they were created; called on app shutdown."""
+    if get_http_client.cache_info().currsize:
+        get_http_client().close()
+        get_http_client.cache_clear()
+    if get_async_http_client.cache_info().currsize:
+        await get_async_http_client().aclose()
+        get_async_http_client.cache_clear()
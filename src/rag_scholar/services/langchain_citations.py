@@ -1,10 +1,58 @@
 """Enhanced citation extraction with document grouping and metadata."""
 
 import re
+import structlog
+from pathlib import Path
 from typing import List, Dict, Any
 from collections import defaultdict
 from .citation_validator import CitationValidator
 
+logger = structlog.get_logger()
+
+# File extension -> document type shown on citation cards
+DOCUMENT_TYPES = {
+    ".pdf": "pdf",
+    ".doc": "doc",
+    ".docx": "doc",
+    ".txt": "text",
+    ".md": "text",
+    ".html": "html",
+    ".htm": "html",
+}
+
+# Inline [#n] citation markers emitted by the LLM
+CITATION_RE = re.compile(r'\[#(\d+)\]', re.ASCII)
+
+# Simple greetings and conversational patterns, fused into one case-insensitive regex
+_CONVERSATIONAL_PATTERNS = [
+    # Direct greetings
+    r'^(hi|hello|hey|hiya|howdy)$',
+    r'^(hi|hello|hey|hiya|howdy)[.!]*$',
+
+    # How are you variants
+    r'^(how are you|how\'re you|how are ya)[\?\!\.]*$',
+    r'^(what\'s up|whats up|wassup)[\?\!\.]*$',
+    r'^(how\'s it going|hows it going)[\?\!\.]*$',
+
+    # Good morning/evening etc
+    r'^(good morning|good afternoon|good evening|good night)[\!\.\,]*$',
+
+    # Thanks and responses
+    r'^(thanks|thank you|thx|ty)[\!\.\,]*$',
+    r'^(you\'re welcome|youre welcome|no problem|np)[\!\.\,]*$',
+
+    # Simple affirmatives/negatives
+    r'^(yes|yeah|yep|yup|ok|okay|sure|fine)[\!\.\,]*$',
+    r'^(no|nope|nah)[\!\.\,]*$',
+
+    # Goodbye
+    r'^(bye|goodbye|see ya|see you|cya|later)[\!\.\,]*$',
+]
+CONVERSATIONAL_RE = re.compile(
+    '|'.join(f'(?:{pattern})' for pattern in _CONVERSATIONAL_PATTERNS),
+    re.IGNORECASE,
+)
+
 
 def extract_citations_from_response(text: str, context_docs: List[Dict[str, Any]], validate_citations: bool = False) -> Dict[str, Any]:
     """Extract citations with enhanced grouping and metadata for better UX."""
@@ -16,9 +64,11 @@ def extract_citations_from_response(text: str, context_docs: List[Dict[str, Any]
             validated_result = validator.enhance_citations_with_validation(text, context_docs)
 
             # Convert [#n] markers to [CITE:n] for frontend inline citation system
-            processed_text = validated_result["response"]
-            for i in range(1, len(context_docs) + 1):
-                processed_text = processed_text.replace(f'[#{i}]', f'[CITE:{i}]')
+            doc_count = len(context_docs)
+            processed_text = CITATION_RE.sub(
+                lambda m: f'[CITE:{m.group(1)}]' if 1 <= int(m.group(1)) <= doc_count else m.group(0),
+                validated_result["response"],
+            )
 
             return {
                 "response": processed_text,
@@ -29,26 +79,22 @@ def extract_citations_from_response(text: str, context_docs: List[Dict[str, Any]
             }
         except Exception as e:
             # Fall back to original processing if validation fails
-            print(f"Citation validation failed: {e}")
+            logger.warning("Citation validation failed", error=str(e))
 
     # Original citation processing (fallback)
-    citation_pattern = re.compile(r'\[#(\d+)\]')
-    citation_matches = citation_pattern.findall(text)
-    citation_ids = [int(match) for match in citation_matches]
+    citation_matches = CITATION_RE.findall(text)
 
     # If no citations found in text but context docs exist, add citations automatically
     if not citation_matches and context_docs:
         # Add citation markers at the end of the first few sentences/paragraphs
         processed_text = _add_automatic_citations(text, len(context_docs))
         # Re-extract citation patterns
-        citation_matches = re.findall(r'\[#(\d+)\]', processed_text)
-        citation_ids = [int(match) for match in citation_matches]
+        citation_matches = CITATION_RE.findall(processed_text)
     else:
         processed_text = text
 
     # Convert [#n] markers to [CITE:n] for frontend inline citation system
-    for match in sorted(set(citation_matches), key=int, reverse=True):
-        processed_text = processed_text.replace(f'[#{match}]', f'[CITE:{match}]')
+    processed_text = CITATION_RE.sub(r'[CITE:\1]', processed_text)
 
     # First pass: build a map of source files to their preferred display names
     source_file_to_name = {}
@@ -83,95 +129,65 @@ def extract_citations_from_response(text: str, context_docs: List[Dict[str, Any]
                     f'Document {i}'
                 )
 
-    # Group citations by source document
-    sources_map = defaultdict(list)
     citations = []
 
-    for cite_id in set(citation_ids):
-        if cite_id <= len(context_docs):
-            doc = context_docs[cite_id - 1]  # 1-indexed
-
-            # Use the mapped source name for consistency
-            source_file = doc.get('source') or doc.get('metadata', {}).get('source')
-            source_title = source_file_to_name.get(source_file, f'Document {cite_id}')
-
-            # Extract page info directly from metadata (line info doesn't exist in chunks)
-            metadata = doc.get('metadata', {})
-            page_num = metadata.get('page_label') or metadata.get('page')
-            line_start = metadata.get('line_start')  # Line info now available from chunking
-            line_end = metadata.get('line_start', 0) + metadata.get('line_count', 1) - 1 if metadata.get('line_start') else None
-
-            # Content should be directly available
-            content = doc.get('content', '')
-
-            # Create enhanced citation compatible with new frontend format
-            preview_text = _create_preview(content)
-            citation = {
-                "id": cite_id,
-                "source": source_title,  # Frontend expects 'source' field
-                "page": page_num,
-                "line": line_start,  # Frontend expects 'line' field
-                "preview": preview_text,
-                "summary": doc.get('summary', ''),
-                "confidence": doc.get('score', 1.0),  # Frontend expects 'confidence'
-                "document_type": _extract_document_type(doc.get('source', '')),
-                "full_text": content,  # Keep for backward compatibility
-                "relevance_score": doc.get('score', 1.0),  # Keep for backward compatibility
-                "chunk_content": content,  # Explicitly include chunk content
-                "debug_info": {
-                    "content_length": len(content),
-                    "preview_length": len(preview_text),
-                    "has_content": bool(content.strip()),
-                    "source_file": doc.get('source', 'No source'),
-                    "metadata_keys": list(doc.get('metadata', {}).keys())
-                }
-            }
+    # Only ids that point at a retrieved document can become citations, in order of appearance
+    doc_count = len(context_docs)
+    valid_ids = [cite_id for cite_id in dict.fromkeys(map(int, citation_matches)) if 1 <= cite_id <= doc_count]
 
-            citations.append(citation)
-            sources_map[source_title].append(citation)
+    for cite_id in valid_ids:
+        doc = context_docs[cite_id - 1]  # 1-indexed
 
-    # Create grouped sources for display
-    grouped_sources = []
-    for source_title, source_citations in sources_map.items():
-        # Get all pages for this source
-        pages = []
-        for c in source_citations:
-            if c['page'] is not None:
-                try:
-                    # Convert page to int, handle both string and int types
-                    page_num = int(c['page']) if isinstance(c['page'], str) else c['page']
-                    pages.append(page_num)
-                except (ValueError, TypeError):
-                    # Skip invalid page numbers
-                    continue
-        pages = sorted(set(pages))
+        # Use the mapped source name for consistency
+        source_file = doc.get('source') or doc.get('metadata', {}).get('source')
+        source_title = source_file_to_name.get(source_file, f'Document {cite_id}')
 
-        # Create page range display
-        page_display = _format_page_range(pages) if pages else None
+        # Extract page info directly from metadata (line info doesn't exist in chunks)
+        metadata = doc.get('metadata', {})
+        page_num = metadata.get('page_label') or metadata.get('page')
+        line_start = metadata.get('line_start')  # Line info now available from chunking
+        line_end = metadata.get('line_start', 0) + metadata.get('line_count', 1) - 1 if metadata.get('line_start') else None
+
+        # Content should be directly available
+        content = doc.get('content', '')
+
+        # Create enhanced citation compatible with new frontend format
+        preview_text = _create_preview(content)
+        citation = {
+            "id": cite_id,
+            "source": source_title,  # Frontend expects 'source' field
+            "page": page_num,
+            "line": line_start,  # Frontend expects 'line' field
+            "preview": preview_text,
+            "summary": doc.get('summary', ''),
+            "confidence": doc.get('score', 1.0),  # Frontend expects 'confidence'
+            "document_type": _extract_document_type(doc.get('source', '')),
+            "full_text": content,  # Keep for backward compatibility
+            "relevance_score": doc.get('score', 1.0),  # Keep for backward compatibility
+            "chunk_content": content,  # Explicitly include chunk content
+            "debug_info": {
+                "content_length": len(content),
+                "preview_length": len(preview_text),
+                "has_content": bool(content.strip()),
+                "source_file": doc.get('source', 'No source'),
+                "metadata_keys": list(doc.get('metadata', {}).keys())
+            }
+        }
 
-        # Get the source file from any citation
-        source_file = next((c.get('source', '') for c in source_citations if c.get('source')), '')
+        citations.append(citation)
 
-        grouped_sources.append({
-            "title": source_title,
-            "file": source_file,
-            "pages": pages,
-            "page_display": page_display,
-            "citations": source_citations,
-            "chunk_count": len(source_citations)
-        })
+    # Create grouped sources for display
+    grouped_sources = _create_grouped_sources(citations)
+    sources = list(dict.fromkeys(citation["source"] for citation in citations))
 
     # Sort citations by ID for inline display
     citations.sort(key=lambda x: x["id"])
 
-    # Sort grouped sources alphabetically
-    grouped_sources.sort(key=lambda x: x["title"])
-
     return {
         "response": processed_text,  # Text with [CITE:n] markers for frontend
         "citations": citations,
         "grouped_sources": grouped_sources,
-        "sources": list(sources_map.keys())
+        "sources": sources
     }
 
 
@@ -180,17 +196,7 @@ def _extract_document_type(source: str) -> str:
     if not source:
         return "document"
 
-    source_lower = source.lower()
-    if source_lower.endswith('.pdf'):
-        return "pdf"
-    elif source_lower.endswith(('.doc', '.docx')):
-        return "doc"
-    elif source_lower.endswith(('.txt', '.md')):
-        return "text"
-    elif source_lower.endswith(('.html', '.htm')):
-        return "html"
-    else:
-        return "document"
+    return DOCUMENT_TYPES.get(Path(source).suffix.lower(), "document")
 
 
 def _create_preview(content: str, max_length: int = 150) -> str:
@@ -354,41 +360,14 @@ def is_meaningful_query(query: str) -> bool:
     return True
 
 
+def is_background_query(query: str) -> bool:
+    """Check if query explicitly asks for general knowledge with /background."""
+    return bool(query) and query.lstrip()[:11].lower() == "/background"
+
+
 def is_conversational_query(query: str) -> bool:
     """Check if query is a simple conversational greeting or social interaction."""
     if not query:
         return False
 
-    query_lower = query.strip().lower()
-
-    # Simple greetings and conversational patterns
-    conversational_patterns = [
-        # Direct greetings
-        r'^(hi|hello|hey|hiya|howdy)$',
-        r'^(hi|hello|hey|hiya|howdy)[.!]*$',
-
-        # How are you variants
-        r'^(how are you|how\'re you|how are ya)[\?\!\.]*$',
-        r'^(what\'s up|whats up|wassup)[\?\!\.]*$',
-        r'^(how\'s it going|hows it going)[\?\!\.]*$',
-
-        # Good morning/evening etc
-        r'^(good morning|good afternoon|good evening|good night)[\!\.\,]*$',
-
-        # Thanks and responses
-        r'^(thanks|thank you|thx|ty)[\!\.\,]*$',
-        r'^(you\'re welcome|youre welcome|no problem|np)[\!\.\,]*$',
-
-        # Simple affirmatives/negatives
-        r'^(yes|yeah|yep|yup|ok|okay|sure|fine)[\!\.\,]*$',
-        r'^(no|nope|nah)[\!\.\,]*$',
-
-        # Goodbye
-        r'^(bye|goodbye|see ya|see you|cya|later)[\!\.\,]*$',
-    ]
-
-    for pattern in conversational_patterns:
-        if re.match(pattern, query_lower):
-            return True
-
-    return False
\ No newline at end of file
+    return CONVERSATIONAL_RE.match(query.strip()) is not None
\ No newline at end of file
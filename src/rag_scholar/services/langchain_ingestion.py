@@ -1,24 +1,292 @@
 """LangChain-based document ingestion pipeline."""
 
+import asyncio
+import hashlib
+import importlib
 import structlog
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import List
 
-from langchain_community.document_loaders import (
-    PyPDFLoader,
-    Docx2txtLoader,
-    TextLoader,
-    UnstructuredMarkdownLoader,
-    CSVLoader,
-    GCSFileLoader,
-)
-from langchain_text_splitters import RecursiveCharacterTextSplitter, NLTKTextSplitter
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_google_firestore import FirestoreVectorStore
 from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
 
+from .query_cache import QueryCache
+
 logger = structlog.get_logger()
 
+# Loader mapping: extension -> (module, class), imported on first use so the
+# unstructured/pypdf import chains stay out of API cold start
+LOADERS = {
+    ".pdf": ("langchain_community.document_loaders", "PyPDFLoader"),
+    ".docx": ("langchain_community.document_loaders", "Docx2txtLoader"),
+    ".txt": ("langchain_community.document_loaders", "TextLoader"),
+    ".md": ("langchain_community.document_loaders", "UnstructuredMarkdownLoader"),
+    ".csv": ("langchain_community.document_loaders", "CSVLoader"),
+}
+
+# Retrieval results keyed by (user_id, embedding model, dimensions, class_id,
+# normalized query, k); shared across requests because pipelines are created per
+# request. Invalidation only reaches this worker, so the TTL bounds staleness on
+# the other workers/instances
+_search_cache = QueryCache(max_size=512, ttl=5)
+
+# Query embeddings keyed by (embedding model, dimensions, query text); these never go stale
+_query_embedding_cache = QueryCache(max_size=256, ttl=3600)
+
+# FirestoreVectorStore handles keyed by (user_id, api key, embedding model, dimensions),
+# shared across per-request pipelines so each request skips client setup
+_vector_stores = QueryCache(max_size=256, ttl=3600)
+
+
+def _invalidate_search_cache(user_id: str) -> None:
+    """Drop cached search results for a user after their chunks change."""
+    _search_cache.invalidate(lambda key: key[0] == user_id)
+
+# Maximum writes per Firestore batch commit
+FIRESTORE_BATCH_LIMIT = 500
+
+# PDFs longer than this are extracted as page ranges across the parse pool
+PDF_PARALLEL_MIN_PAGES = 32
+
+# Keyword tables for chunk content detection, checked against upper-cased text
+# unless noted otherwise
+HAS_CODE_KEYWORDS = ('SELECT', 'FROM', 'WHERE', 'def ', 'class ', 'import ')
+SQL_KEYWORDS = ('SELECT', 'FROM', 'WHERE', 'INSERT', 'UPDATE')
+CODE_KEYWORDS = ('DEF ', 'CLASS ', 'IMPORT ', 'RETURN')
+FIGURE_KEYWORDS = ('FIGURE', 'TABLE', 'CHART', 'DIAGRAM')
+# Checked against the original text
+EQUATION_SYMBOLS = ('=', '∫', '∑', '∂', '√')
+MATH_MARKERS = ('∫', '∑', '∂', '√', 'lim', 'theorem')
+
+
+@lru_cache(maxsize=2)
+def _get_reranker(model_name: str):
+    """Load a sentence-transformers cross-encoder once per process."""
+    from sentence_transformers import CrossEncoder
+
+    return CrossEncoder(model_name, device="cpu")
+
+
+@lru_cache(maxsize=32)
+def _get_embeddings(
+    api_key: str,
+    model: str,
+    dimensions: int | None,
+    batch_size: int,
+    max_retries: int,
+    cache_dir: str | None,
+):
+    """Build the embeddings client once per key/model configuration instead of per request."""
+    from .http_clients import get_async_http_client, get_http_client
+
+    embeddings = OpenAIEmbeddings(
+        api_key=api_key,
+        model=model,
+        dimensions=dimensions,
+        chunk_size=batch_size,  # Texts per embeddings request
+        max_retries=max_retries,
+        # Pooled connections shared across users' clients
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+    )
+
+    # Optionally reuse chunk embeddings across uploads: SHA-256 content keys,
+    # float16 vectors in one SQLite file, so only new chunks hit the API
+    if cache_dir:
+        from langchain.embeddings import CacheBackedEmbeddings
+        from langchain.storage import EncoderBackedStore
+
+        from .embedding_store import SQLiteByteStore, decode_float16, embedding_cache_key, encode_float16
+
+        namespace = f"{model}:{dimensions or 'native'}"
+        embeddings = CacheBackedEmbeddings(
+            embeddings,
+            EncoderBackedStore(
+                SQLiteByteStore(Path(cache_dir) / "embeddings.sqlite"),
+                key_encoder=lambda text: embedding_cache_key(namespace, text),
+                value_serializer=encode_float16,
+                value_deserializer=decode_float16,
+            ),
+        )
+
+    return embeddings
+
+
+@lru_cache(maxsize=4)
+def _get_text_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """Build the chunk splitter once per chunking configuration."""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\\n\\n", "\\n", " ", ""],
+        keep_separator=True,  # Keep separators for better context
+        add_start_index=True,  # Add start index to metadata
+    )
+
+
+@lru_cache(maxsize=None)
+def _get_loader_class(file_extension: str):
+    """Resolve the LangChain loader class for an extension, or None if unsupported."""
+    if file_extension not in LOADERS:
+        return None
+
+    module_path, class_name = LOADERS[file_extension]
+    return getattr(importlib.import_module(module_path), class_name)
+
+
+def _load_pdf_fitz(file_content: bytes, filename: str, start: int = 0, stop: int | None = None) -> list[Document]:
+    """Extract PDF pages [start, stop) with PyMuPDF."""
+    import fitz
+
+    with fitz.open(stream=file_content, filetype="pdf") as pdf:
+        pdf_info = {key.lower(): str(value) for key, value in (pdf.metadata or {}).items() if value}
+        total_pages = pdf.page_count
+        stop = total_pages if stop is None else min(stop, total_pages)
+
+        documents = []
+        for i in range(start, stop):
+            page = pdf[i]
+            documents.append(Document(
+                page_content=page.get_text(),
+                metadata={
+                    **pdf_info,
+                    "source": filename,
+                    "total_pages": total_pages,
+                    "page": i,
+                    "page_label": page.get_label() or str(i + 1),
+                },
+            ))
+        return documents
+
+
+def _pdf_page_count(file_content: bytes) -> int:
+    """Count PDF pages with PyMuPDF without extracting any text."""
+    import fitz
+
+    with fitz.open(stream=file_content, filetype="pdf") as pdf:
+        return pdf.page_count
+
+
+def _load_pdf_pypdf2(file_content: bytes, filename: str) -> list[Document]:
+    """Extract PDF pages with PyPDF2."""
+    import io
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+    pdf_info = {
+        key.lstrip("/").lower(): str(value)
+        for key, value in (reader.metadata or {}).items()
+    }
+    try:
+        page_labels = reader.page_labels
+    except Exception:
+        page_labels = []
+    total_pages = len(reader.pages)
+
+    return [
+        Document(
+            page_content=page.extract_text() or "",
+            metadata={
+                **pdf_info,
+                "source": filename,
+                "total_pages": total_pages,
+                "page": i,
+                "page_label": page_labels[i] if i < len(page_labels) else str(i + 1),
+            },
+        )
+        for i, page in enumerate(reader.pages)
+    ]
+
+
+@lru_cache(maxsize=1)
+def _get_pdf_backend():
+    """Pick the fastest installed PDF extractor once, preferring PyMuPDF over PyPDF2."""
+    try:
+        import fitz  # noqa: F401
+        return _load_pdf_fitz
+    except ImportError:
+        logger.info("PyMuPDF not available, using PyPDF2 for PDF extraction")
+        return _load_pdf_pypdf2
+
+
+def _load_from_bytes(file_content: bytes, filename: str, file_extension: str) -> list[Document] | None:
+    """Parse PDF, DOCX, TXT and CSV uploads straight from memory; returns None otherwise."""
+    import io
+
+    if file_extension == ".pdf":
+        return _get_pdf_backend()(file_content, filename)
+
+    if file_extension == ".docx":
+        import docx2txt
+
+        text = docx2txt.process(io.BytesIO(file_content))
+        return [Document(page_content=text, metadata={"source": filename})]
+
+    if file_extension in (".txt", ".csv"):
+        try:
+            text = file_content.decode("utf-8")
+        except UnicodeDecodeError:
+            return None  # Let the path-based loader deal with other encodings
+
+        if file_extension == ".txt":
+            # Same newline translation TextLoader gets from reading in text mode
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+            return [Document(page_content=text, metadata={"source": filename})]
+
+        # One Document per row as "column: value" lines, matching CSVLoader
+        import csv
+
+        return [
+            Document(
+                page_content="\n".join(_csv_field(key, value) for key, value in row.items()),
+                metadata={"source": filename, "row": i},
+            )
+            for i, row in enumerate(csv.DictReader(io.StringIO(text, newline="")))
+        ]
+
+    return None
+
+
+def _csv_field(key: str | None, value) -> str:
+    """Format one CSV cell as CSVLoader does, including short and overlong rows."""
+    if isinstance(value, str):
+        value = value.strip()
+    elif isinstance(value, list):  # Extra cells collected under the None key
+        value = ",".join(map(str.strip, value))
+    return f"{key.strip() if key is not None else key}: {value}"
+
+
+def _load_via_tempfile(file_content: bytes, file_extension: str) -> list[Document]:
+    """Write content to a temp file and load it with a path-based LangChain loader."""
+    import tempfile
+
+    with tempfile.NamedTemporaryFile(suffix=file_extension, delete=False) as temp_file:
+        temp_file.write(file_content)
+        temp_path = Path(temp_file.name)
+
+    try:
+        return _get_loader_class(file_extension)(str(temp_path)).load()
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+def _parse_document(file_content: bytes, filename: str, file_extension: str) -> list[Document]:
+    """Parse an upload into Documents; module-level so it can run in a worker process."""
+    documents = _load_from_bytes(file_content, filename, file_extension)
+    if documents is None:
+        documents = _load_via_tempfile(file_content, file_extension)
+    return documents
+
+
+@lru_cache(maxsize=1)
+def _get_parse_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Process pool for CPU-bound document parsing, created on first upload."""
+    return ProcessPoolExecutor(max_workers=max_workers)
+
 
 class LangChainIngestionPipeline:
     """Pure LangChain document ingestion pipeline."""
@@ -26,33 +294,25 @@ class LangChainIngestionPipeline:
     def __init__(self, settings):
         self.settings = settings
 
-        # Initialize embeddings
-        self.embeddings = OpenAIEmbeddings(
-            api_key=settings.openai_api_key,
-            model=settings.embedding_model,
+        # Embeddings client is shared across pipelines with the same key and model settings
+        self.embeddings = _get_embeddings(
+            settings.openai_api_key,
+            settings.embedding_model,
+            settings.embedding_dimensions,
+            settings.embedding_batch_size,
+            settings.embedding_max_retries,
+            settings.embedding_cache_dir,
         )
 
         # Initialize Firestore client for persistence
         from google.cloud import firestore
         self.firestore_client = firestore.AsyncClient(project=settings.google_cloud_project)
 
-        # Initialize text splitter
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=settings.chunk_size,
-            chunk_overlap=settings.chunk_overlap,
-            separators=["\\n\\n", "\\n", " ", ""],
-            keep_separator=True,  # Keep separators for better context
-            add_start_index=True,  # Add start index to metadata
-        )
+        # Retrievers are reused for the lifetime of this pipeline; vector stores are process-wide
+        self._retrievers: dict[tuple, object] = {}
 
-        # Loader mapping
-        self.loader_map = {
-            ".pdf": PyPDFLoader,
-            ".docx": Docx2txtLoader,
-            ".txt": TextLoader,
-            ".md": UnstructuredMarkdownLoader,
-            ".csv": CSVLoader,
-        }
+        # Text splitter is shared across pipelines with the same chunking settings
+        self.text_splitter = _get_text_splitter(settings.chunk_size, settings.chunk_overlap)
 
     async def ingest_file(
         self,
@@ -66,7 +326,7 @@ class LangChainIngestionPipeline:
         try:
             # Get appropriate loader
             file_extension = file_path.suffix.lower()
-            loader_class = self.loader_map.get(file_extension)
+            loader_class = _get_loader_class(file_extension)
 
             if not loader_class:
                 raise ValueError(f"Unsupported file type: {file_extension}")
@@ -88,7 +348,7 @@ class LangChainIngestionPipeline:
                 })
 
             # Split documents
-            split_docs = self.text_splitter.split_documents(documents)
+            split_docs = self._split_documents(documents)
 
             # Add line information to chunks
             split_docs = self._add_line_information(split_docs)
@@ -98,6 +358,7 @@ class LangChainIngestionPipeline:
 
             # Add to vector store
             await vector_store.aadd_documents(split_docs)
+            _invalidate_search_cache(user_id)
 
             logger.info("Document ingested successfully",
                        file=file_path.name,
@@ -119,10 +380,29 @@ class LangChainIngestionPipeline:
                         error=str(e))
             raise
 
+    def _split_documents(self, documents: List[Document]) -> List[Document]:
+        """Split documents into chunks, passing through ones already within chunk_size."""
+        chunks = []
+        for doc in documents:
+            if len(doc.page_content) > self.settings.chunk_size:
+                chunks.extend(self.text_splitter.split_documents([doc]))
+                continue
+
+            # Same result the splitter gives for a single-chunk text, without its regex passes
+            content = doc.page_content.strip()
+            if content:
+                start_index = len(doc.page_content) - len(doc.page_content.lstrip())
+                chunks.append(Document(
+                    page_content=content,
+                    metadata={**doc.metadata, "start_index": start_index},
+                ))
+        return chunks
+
     def _add_line_information(self, split_docs):
         """Add enhanced metadata to document chunks using production-ready tools."""
         for doc in split_docs:
             content = doc.page_content
+            content_upper = content.upper()
 
             # LangChain already adds start_index if enabled
             start_index = doc.metadata.get('start_index', 0)
@@ -138,27 +418,28 @@ class LangChainIngestionPipeline:
                 'char_count': len(content),
                 'chunk_index': start_index,  # Character position in original document
                 # Content type detection for better display
-                'content_type': self._detect_content_type(content),
-                'has_tables': bool('|' in content and content.count('|') > 3),
-                'has_equations': bool(any(symbol in content for symbol in ['=', '∫', '∑', '∂', '√'])),
-                'has_code': bool(any(keyword in content.upper() for keyword in ['SELECT', 'FROM', 'WHERE', 'def ', 'class ', 'import '])),
+                'content_type': self._detect_content_type(content, content_upper),
+                'has_tables': content.count('|') > 3,
+                'has_equations': any(symbol in content for symbol in EQUATION_SYMBOLS),
+                'has_code': any(keyword in content_upper for keyword in HAS_CODE_KEYWORDS),
             })
 
         return split_docs
 
-    def _detect_content_type(self, content: str) -> str:
+    def _detect_content_type(self, content: str, content_upper: str | None = None) -> str:
         """Detect the type of content for better citation display."""
-        content_upper = content.upper()
+        if content_upper is None:
+            content_upper = content.upper()
 
-        if any(keyword in content_upper for keyword in ['SELECT', 'FROM', 'WHERE', 'INSERT', 'UPDATE']):
+        if any(keyword in content_upper for keyword in SQL_KEYWORDS):
             return 'sql'
-        elif any(keyword in content_upper for keyword in ['DEF ', 'CLASS ', 'IMPORT ', 'RETURN']):
+        elif any(keyword in content_upper for keyword in CODE_KEYWORDS):
             return 'code'
-        elif any(symbol in content for symbol in ['∫', '∑', '∂', '√', 'lim', 'theorem']):
+        elif any(symbol in content for symbol in MATH_MARKERS):
             return 'mathematics'
         elif content.count('|') > 3 and '\n' in content:
             return 'table'
-        elif any(word in content_upper for word in ['FIGURE', 'TABLE', 'CHART', 'DIAGRAM']):
+        elif any(word in content_upper for word in FIGURE_KEYWORDS):
             return 'figure'
         else:
             return 'text'
@@ -172,6 +453,8 @@ class LangChainIngestionPipeline:
         """Ingest document directly from Google Cloud Storage."""
 
         try:
+            from langchain_community.document_loaders import GCSFileLoader
+
             # Use GCS loader
             loader = GCSFileLoader(
                 project_name=self.settings.google_cloud_project,
@@ -194,7 +477,7 @@ class LangChainIngestionPipeline:
                 })
 
             # Split and index
-            split_docs = self.text_splitter.split_documents(documents)
+            split_docs = self._split_documents(documents)
 
             # Add line information to chunks
             split_docs = self._add_line_information(split_docs)
@@ -236,54 +519,54 @@ class LangChainIngestionPipeline:
             db = firestore.Client(project=self.settings.google_cloud_project)
 
             # Query documents by source using proper subcollection structure
+            # Only assigned_classes is read, so skip transferring chunk text and embeddings
             docs_ref = db.collection("users").document(user_id).collection("chunks").where("metadata.source", "==", document_source)
-            docs = docs_ref.get()
+            docs = docs_ref.select(["metadata.assigned_classes"]).get()
 
-            logger.info("Debug: update_document_class",
-                       document_source=document_source,
-                       user_id=user_id,
-                       class_id=class_id,
-                       operation=operation,
-                       docs_found=len(docs))
+            logger.debug("Updating document class",
+                        document_source=document_source,
+                        user_id=user_id,
+                        class_id=class_id,
+                        operation=operation,
+                        docs_found=len(docs))
+
+            # Only chunks whose membership actually changes are written, in batched commits
+            if operation == "add":
+                change = firestore.ArrayUnion([class_id])
+            elif operation == "remove":
+                # ArrayRemove drops ALL instances of the class_id (in case of duplicates)
+                change = firestore.ArrayRemove([class_id])
+            else:
+                change = None
 
+            batch = db.batch()
+            pending = 0
+            updated = 0
             for doc in docs:
-                data = doc.to_dict()
-                metadata = data.get("metadata", {})
-                assigned_classes = metadata.get("assigned_classes", [])
-
-                logger.info("Debug: Before update",
-                           doc_id=doc.id,
-                           current_assigned_classes=assigned_classes,
-                           metadata_keys=list(metadata.keys()) if metadata else [])
-
-                # For ADD: add to all chunks regardless of current state (ensures consistency)
-                # For REMOVE: remove from all chunks that have it (ensures consistency)
-                if operation == "add":
-                    if class_id not in assigned_classes:
-                        assigned_classes.append(class_id)
-                elif operation == "remove":
-                    # Remove ALL instances of the class_id (in case of duplicates)
-                    assigned_classes = [cls for cls in assigned_classes if cls != class_id]
-
-                logger.info("Debug: After update logic",
-                           doc_id=doc.id,
-                           new_assigned_classes=assigned_classes)
-
-                # Update the document
-                doc.reference.update({
-                    "metadata.assigned_classes": assigned_classes
-                })
+                assigned_classes = doc.to_dict().get("metadata", {}).get("assigned_classes", [])
+                if change is None or (class_id in assigned_classes) == (operation == "add"):
+                    continue
+
+                batch.update(doc.reference, {"metadata.assigned_classes": change})
+                pending += 1
+                updated += 1
+                if pending == FIRESTORE_BATCH_LIMIT:
+                    batch.commit()
+                    batch = db.batch()
+                    pending = 0
+
+            if pending:
+                batch.commit()
 
-                logger.info("Debug: Updated document",
-                           doc_id=doc.id,
-                           final_assigned_classes=assigned_classes)
+            _invalidate_search_cache(user_id)
 
             logger.info("Document class updated successfully",
                        document=document_source,
                        user_id=user_id,
                        class_id=class_id,
                        operation=operation,
-                       updated_docs=len(docs))
+                       matched_docs=len(docs),
+                       updated_docs=updated)
 
             return True
 
@@ -300,39 +583,74 @@ class LangChainIngestionPipeline:
         user_id: str,
         class_id: str | None = None,
         k: int = 5
+    ) -> list[dict]:
+        """Search documents, serving repeated queries from the result cache."""
+
+        cache_key = (
+            user_id,
+            self.settings.embedding_model,
+            self.settings.embedding_dimensions,
+            class_id,
+            " ".join(query.lower().split()),
+            k,
+        )
+        cached = _search_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Search cache hit", user_id=user_id, class_id=class_id)
+            return list(cached)
+
+        reranker_model = self.settings.reranker_model
+        fetch_k = max(k, self.settings.rerank_candidates) if reranker_model else k
+        results = await self._search_documents(query, user_id, class_id, fetch_k)
+        if reranker_model and len(results) > 1:
+            results = await asyncio.to_thread(self._rerank, reranker_model, query, results, k)
+        if results:
+            _search_cache.set(cache_key, results)
+        return list(results)
+
+    def _rerank(self, model_name: str, query: str, results: list[dict], k: int) -> list[dict]:
+        """Reorder search results by cross-encoder relevance and keep the top k."""
+        try:
+            scores = _get_reranker(model_name).predict(
+                [(query, result["content"]) for result in results],
+                batch_size=16,
+            )
+        except Exception as e:
+            logger.warning("Reranking failed, keeping vector order", error=str(e))
+            return results[:k]
+
+        ranked = sorted(zip(scores, results), key=lambda pair: pair[0], reverse=True)[:k]
+        return [{**result, "rerank_score": float(score)} for score, result in ranked]
+
+    async def _search_documents(
+        self,
+        query: str,
+        user_id: str,
+        class_id: str | None = None,
+        k: int = 5
     ) -> list[dict]:
         """Search documents using FirestoreVectorStore similarity_search."""
 
         try:
+            # Embed the query once; both the class-filtered and full searches use the vector
+            query_embedding = await self._embed_query(query)
+
+            # Server-side KNN with a class pre-filter (needs a composite vector index)
+            if class_id and self.settings.firestore_vector_search:
+                return self._search_class_nearest(query_embedding, user_id, class_id, k)
+
             # FirestoreVectorStore filter doesn't work properly, so we implement manual filtering
             if class_id:
                 logger.info("Applying manual class filtering (FirestoreVectorStore filter broken)",
                            class_id=class_id,
                            user_id=user_id)
 
-                # Get embeddings for the query
-                query_embedding = self.embeddings.embed_query(query)
-
                 # Direct Firestore query with proper filtering
                 from google.cloud import firestore
                 import numpy as np
 
                 db = firestore.Client(project=self.settings.google_cloud_project)
 
-
-                # First check what class IDs actually exist in documents
-                all_docs_sample = db.collection("users").document(user_id).collection("chunks").limit(3).get()
-                existing_classes = set()
-                for doc in all_docs_sample:
-                    doc_data = doc.to_dict()
-                    classes = doc_data.get('metadata', {}).get('assigned_classes', [])
-                    existing_classes.update(classes)
-
-                logger.info("Debug: Existing class IDs in documents",
-                           looking_for=class_id,
-                           existing_classes=list(existing_classes),
-                           user_id=user_id)
-
                 # Query documents that contain the class using proper subcollection structure
                 docs_ref = db.collection("users").document(user_id).collection("chunks").where(
                     "metadata.assigned_classes", "array_contains", class_id
@@ -353,8 +671,10 @@ class LangChainIngestionPipeline:
                                class_id=class_id)
                     return []
 
-                # Calculate similarities manually
-                scored_results = []
+                # Fill one preallocated float32 matrix (row i <-> candidates[i]) and score it in a single matmul
+                query_emb_array = np.asarray(query_embedding, dtype=np.float32)
+                matrix = np.empty((len(docs), query_emb_array.shape[0]), dtype=np.float32)
+                candidates = []
                 docs_with_embeddings = 0
                 docs_without_embeddings = 0
                 for i, doc in enumerate(docs):
@@ -366,52 +686,14 @@ class LangChainIngestionPipeline:
                         data.get("metadata", {}).get("embedding")  # Nested in metadata
                     )
 
-                    # Debug first few documents
-                    if i < 3:
-                        embedding_length = None
-                        if doc_embedding:
-                            try:
-                                embedding_length = len(doc_embedding)
-                            except:
-                                try:
-                                    embedding_array = np.array(doc_embedding)
-                                    embedding_length = embedding_array.shape[0] if embedding_array.ndim > 0 else None
-                                except:
-                                    embedding_length = "unknown"
-
-                        logger.info("Debug document structure",
-                                   doc_index=i,
-                                   has_embedding=bool(doc_embedding),
-                                   embedding_type=type(doc_embedding).__name__ if doc_embedding else None,
-                                   embedding_length=embedding_length,
-                                   all_keys=list(data.keys()),
-                                   metadata_keys=list(data.get("metadata", {}).keys()),
-                                   content_preview=data.get("content", data.get("page_content", ""))[:100])
-
                     # Handle both list embeddings and Firestore Vector type
                     if doc_embedding:
                         try:
-                            # Try to convert to numpy array - this handles both lists and Firestore Vectors
-                            doc_emb_array = np.array(doc_embedding)
-                            if doc_emb_array.ndim > 0 and doc_emb_array.shape[0] > 0:
+                            doc_emb_array = np.asarray(list(doc_embedding), dtype=np.float32)
+                            if doc_emb_array.shape == query_emb_array.shape:
+                                matrix[docs_with_embeddings] = doc_emb_array
                                 docs_with_embeddings += 1
-                                # Calculate cosine similarity
-                                query_emb_array = np.array(query_embedding)
-
-                                # Cosine similarity
-                                dot_product = np.dot(query_emb_array, doc_emb_array)
-                                norm_query = np.linalg.norm(query_emb_array)
-                                norm_doc = np.linalg.norm(doc_emb_array)
-
-                                if norm_query > 0 and norm_doc > 0:
-                                    similarity = dot_product / (norm_query * norm_doc)
-
-                                    scored_results.append({
-                                        "content": data.get("content", data.get("page_content", "")),
-                                        "source": data.get("metadata", {}).get("source", "Unknown"),
-                                        "score": float(similarity),
-                                        "metadata": data.get("metadata", {})
-                                    })
+                                candidates.append(data)
                         except Exception as e:
                             logger.warning("Failed to process embedding",
                                          doc_index=i,
@@ -420,9 +702,27 @@ class LangChainIngestionPipeline:
                     else:
                         docs_without_embeddings += 1
 
-                # Sort by similarity score and take top k
-                scored_results.sort(key=lambda x: x["score"], reverse=True)
-                scored_results = scored_results[:k]
+                scored_results = []
+                norm_query = np.linalg.norm(query_emb_array)
+                if candidates and norm_query > 0:
+                    # Unit-normalize the query once so cosine is a dot product over row norms
+                    query_emb_array /= norm_query
+                    matrix = matrix[:docs_with_embeddings]
+                    norms = np.linalg.norm(matrix, axis=1)
+                    similarities = (matrix @ query_emb_array) / np.where(norms > 0, norms, np.inf)
+
+                    # Select the top k with argpartition, then sort only those by similarity score
+                    top = np.argpartition(-similarities, k)[:k] if len(similarities) > k else np.arange(len(similarities))
+                    for idx in top[np.argsort(-similarities[top])]:
+                        if norms[idx] == 0:
+                            continue
+                        data = candidates[idx]
+                        scored_results.append({
+                            "content": data.get("content", data.get("page_content", "")),
+                            "source": data.get("metadata", {}).get("source", "Unknown"),
+                            "score": float(similarities[idx]),
+                            "metadata": data.get("metadata", {})
+                        })
 
                 logger.info("Manual similarity calculation completed",
                            query=query[:50],
@@ -438,7 +738,7 @@ class LangChainIngestionPipeline:
             else:
                 # Only search all documents if no class is specified
                 vector_store = self._get_vector_store(user_id)
-                results = vector_store.similarity_search(query, k=k)
+                results = vector_store.similarity_search_by_vector(query_embedding, k=k)
 
             # Convert LangChain results to standard format for non-class searches
             scored_results = []
@@ -475,103 +775,114 @@ class LangChainIngestionPipeline:
         metadata: dict | None = None
     ) -> dict:
         """Ingest document from uploaded file content."""
-        import tempfile
 
         try:
             # Get file extension
             file_extension = f".{filename.split('.')[-1].lower()}" if filename else ""
-            loader_class = self.loader_map.get(file_extension)
+            loader_class = _get_loader_class(file_extension)
 
             if not loader_class:
                 raise ValueError(f"Unsupported file type: {file_extension}")
 
-            # Save to temp file for loader
-            with tempfile.NamedTemporaryFile(suffix=file_extension, delete=False) as temp_file:
-                temp_file.write(file_content)
-                temp_path = Path(temp_file.name)
+            # Identical bytes already ingested for this user reuse the stored chunks and embeddings
+            content_hash = hashlib.sha256(file_content).hexdigest()
+            uploader_id = metadata.get("uploaded_by") if metadata else None
+            if uploader_id:
+                existing = await asyncio.to_thread(self._find_document_by_hash, uploader_id, content_hash)
+                if existing:
+                    logger.info("Skipping duplicate document upload",
+                               filename=filename,
+                               user_id=uploader_id,
+                               document_id=existing["document_id"])
+                    return {
+                        "document_id": existing["document_id"],
+                        "filename": existing.get("filename", filename),
+                        "chunks": existing.get("chunks_count", 0),
+                        "status": "duplicate"
+                    }
+
+            # Parse from memory where possible (temp file fallback) off the event loop;
+            # parsing is CPU-bound, so use worker processes when configured
+            if self.settings.parse_workers > 0:
+                documents = await self._parse_in_pool(file_content, filename, file_extension)
+            else:
+                documents = await asyncio.to_thread(_parse_document, file_content, filename, file_extension)
 
-            try:
-                # Load document
-                loader = loader_class(str(temp_path))
-                documents = loader.load()
-
-                if not documents:
-                    raise ValueError("No content extracted from document")
-
-                # Add metadata
-                document_id = f"{metadata.get('uploaded_by') if metadata else 'unknown'}_{filename}_{len(documents)}"
-
-                for doc in documents:
-                    doc.metadata.update({
-                        "source": filename,
-                        "document_id": document_id,
-                        "file_type": file_extension,
-                        "assigned_classes": [],  # Empty by default, can be updated later
-                        "upload_date": "now",  # Could use proper timestamp
-                    })
-                    if metadata:
-                        doc.metadata.update(metadata)
-
-                # Split documents
-                split_docs = self.text_splitter.split_documents(documents)
-
-                # Add line information using LangChain's built-in metadata
-                split_docs = self._add_line_information(split_docs)
-
-                # Get vector store for user
-                user_id = metadata.get("uploaded_by") if metadata else None
-                if not user_id:
-                    raise ValueError("User ID required in metadata")
+            if not documents:
+                raise ValueError("No content extracted from document")
 
-                vector_store = self._get_vector_store(user_id)
+            # Add metadata
+            document_id = f"{metadata.get('uploaded_by') if metadata else 'unknown'}_{filename}_{len(documents)}"
+
+            for doc in documents:
+                doc.metadata.update({
+                    "source": filename,
+                    "document_id": document_id,
+                    "file_type": file_extension,
+                    "assigned_classes": [],  # Empty by default, can be updated later
+                    "upload_date": "now",  # Could use proper timestamp
+                })
+                if metadata:
+                    doc.metadata.update(metadata)
+
+            # Split documents
+            split_docs = self._split_documents(documents)
 
-                # Add to vector store
-                await vector_store.aadd_documents(split_docs)
+            # Add line information using LangChain's built-in metadata
+            split_docs = self._add_line_information(split_docs)
 
-                # Generate document ID from first chunk
-                document_id = f"{user_id}_{filename}_{len(split_docs)}"
+            # Get vector store for user
+            user_id = metadata.get("uploaded_by") if metadata else None
+            if not user_id:
+                raise ValueError("User ID required in metadata")
 
-                # Store document metadata in user's documents subcollection
-                try:
-                    from google.cloud import firestore
-                    import datetime
+            vector_store = self._get_vector_store(user_id)
 
-                    db = firestore.Client(project=self.settings.google_cloud_project)
-                    doc_ref = db.collection(f"users/{user_id}/documents").document(document_id)
+            # Add to vector store
+            await vector_store.aadd_documents(split_docs)
+            _invalidate_search_cache(user_id)
 
-                    doc_ref.set({
-                        "filename": filename,
-                        "document_id": document_id,
-                        "upload_date": datetime.datetime.now(),
-                        "file_type": file_extension,
-                        "chunks_count": len(split_docs),
-                        "assigned_classes": [],  # Empty by default
-                        "metadata": metadata or {}
-                    })
+            # Generate document ID from first chunk
+            document_id = f"{user_id}_{filename}_{len(split_docs)}"
 
-                    logger.info("Document metadata stored successfully",
-                               document_id=document_id,
-                               user_id=user_id)
-                except Exception as e:
-                    logger.warning("Failed to store document metadata",
-                                 document_id=document_id,
-                                 error=str(e))
-
-                logger.info("Document uploaded and ingested successfully",
-                           filename=filename,
-                           user_id=user_id,
-                           chunks=len(split_docs))
+            # Store document metadata in user's documents subcollection
+            try:
+                from google.cloud import firestore
+                import datetime
 
-                return {
-                    "document_id": document_id,
+                db = firestore.Client(project=self.settings.google_cloud_project)
+                doc_ref = db.collection(f"users/{user_id}/documents").document(document_id)
+
+                await asyncio.to_thread(doc_ref.set, {
                     "filename": filename,
-                    "chunks": len(split_docs),
-                    "status": "success"
-                }
+                    "document_id": document_id,
+                    "upload_date": datetime.datetime.now(),
+                    "file_type": file_extension,
+                    "chunks_count": len(split_docs),
+                    "content_hash": content_hash,
+                    "assigned_classes": [],  # Empty by default
+                    "metadata": metadata or {}
+                })
 
-            finally:
-                # Clean up temp file
-                temp_path.unlink(missing_ok=True)
+                logger.info("Document metadata stored successfully",
+                           document_id=document_id,
+                           user_id=user_id)
+            except Exception as e:
+                logger.warning("Failed to store document metadata",
+                             document_id=document_id,
+                             error=str(e))
+
+            logger.info("Document uploaded and ingested successfully",
+                       filename=filename,
+                       user_id=user_id,
+                       chunks=len(split_docs))
+
+            return {
+                "document_id": document_id,
+                "filename": filename,
+                "chunks": len(split_docs),
+                "status": "success"
+            }
 
         except Exception as e:
             logger.error("Document ingestion failed",
@@ -579,14 +890,52 @@ class LangChainIngestionPipeline:
                         error=str(e))
             raise
 
+    async def _parse_in_pool(self, file_content: bytes, filename: str, file_extension: str) -> list[Document]:
+        """Parse on the process pool, fanning long PyMuPDF-readable PDFs out by page range."""
+        loop = asyncio.get_running_loop()
+        workers = self.settings.parse_workers
+        pool = _get_parse_pool(workers)
+
+        page_count = 0
+        if file_extension == ".pdf" and workers > 1 and _get_pdf_backend() is _load_pdf_fitz:
+            try:
+                page_count = await asyncio.to_thread(_pdf_page_count, file_content)
+            except Exception:
+                page_count = 0  # Let the regular path surface the parse error
+
+        if page_count <= PDF_PARALLEL_MIN_PAGES:
+            return await loop.run_in_executor(pool, _parse_document, file_content, filename, file_extension)
+
+        step = -(-page_count // workers)
+        parts = await asyncio.gather(*(
+            loop.run_in_executor(pool, _load_pdf_fitz, file_content, filename, start, start + step)
+            for start in range(0, page_count, step)
+        ))
+        return [doc for part in parts for doc in part]
+
+    def _find_document_by_hash(self, user_id: str, content_hash: str) -> dict | None:
+        """Return the stored document metadata with this content hash, if any."""
+        try:
+            from google.cloud import firestore
+
+            db = firestore.Client(project=self.settings.google_cloud_project)
+            matches = (
+                db.collection(f"users/{user_id}/documents")
+                .where("content_hash", "==", content_hash)
+                .select(["document_id", "filename", "chunks_count"])
+                .limit(1)
+                .get()
+            )
+            return matches[0].to_dict() if matches else None
+        except Exception as e:
+            logger.warning("Duplicate document lookup failed", user_id=user_id, error=str(e))
+            return None
+
     async def delete_document(self, user_id: str, document_ids: list[str]) -> bool:
         """Delete documents from both vector store and metadata collection."""
         try:
             from google.cloud import firestore
 
-            # 1. Delete from vector store chunks
-            vector_store = self._get_vector_store(user_id)
-
             # For each document, find and delete all its chunks
             db = firestore.Client(project=self.settings.google_cloud_project)
 
@@ -603,7 +952,7 @@ class LangChainIngestionPipeline:
                         # Delete all chunks for this document from vector store
                         chunks_ref = db.collection(f"users/{user_id}/chunks")
                         chunks_query = chunks_ref.where("metadata.source", "==", filename)
-                        chunks = chunks_query.get()
+                        chunks = chunks_query.select([]).get()  # References only
 
                         # Delete each chunk
                         for chunk in chunks:
@@ -620,6 +969,8 @@ class LangChainIngestionPipeline:
                                document_id=document_id,
                                filename=filename)
 
+            _invalidate_search_cache(user_id)
+
             logger.info("Documents deleted successfully",
                        user_id=user_id,
                        document_count=len(document_ids))
@@ -631,20 +982,77 @@ class LangChainIngestionPipeline:
                         error=str(e))
             return False
 
+    def _search_class_nearest(self, query_embedding: list[float], user_id: str, class_id: str, k: int) -> list[dict]:
+        """Class-filtered search using Firestore's native find_nearest vector query."""
+        from google.cloud import firestore
+        from google.cloud.firestore_v1.base_vector_query import DistanceMeasure
+        from google.cloud.firestore_v1.vector import Vector
+
+        db = firestore.Client(project=self.settings.google_cloud_project)
+        vector_query = db.collection("users").document(user_id).collection("chunks").where(
+            "metadata.assigned_classes", "array_contains", class_id
+        ).find_nearest(
+            vector_field="embedding",
+            query_vector=Vector(query_embedding),
+            distance_measure=DistanceMeasure.COSINE,
+            limit=k,
+            distance_result_field="vector_distance",
+        )
+
+        results = []
+        for doc in vector_query.get():
+            data = doc.to_dict()
+            results.append({
+                "content": data.get("content", data.get("page_content", "")),
+                "source": data.get("metadata", {}).get("source", "Unknown"),
+                "score": 1.0 - float(data.get("vector_distance", 1.0)),
+                "metadata": data.get("metadata", {})
+            })
+
+        logger.info("Native vector search completed",
+                   user_id=user_id,
+                   class_id=class_id,
+                   results_count=len(results))
+        return results
+
+    async def _embed_query(self, query: str) -> list[float]:
+        """Embed a search query without blocking the event loop, reusing cached vectors."""
+        cache_key = (self.settings.embedding_model, self.settings.embedding_dimensions, query)
+        embedding = _query_embedding_cache.get(cache_key)
+        if embedding is None:
+            embedding = await self.embeddings.aembed_query(query)
+            _query_embedding_cache.set(cache_key, embedding)
+        return embedding
+
     def _get_vector_store(self, user_id: str) -> FirestoreVectorStore:
         """Get FirestoreVectorStore for user using proper subcollection structure."""
 
-        # Use Firestore subcollection: users/{user_id}/chunks
-        collection_name = f"users/{user_id}/chunks"
-
-        return FirestoreVectorStore(
-            collection=collection_name,
-            embedding_service=self.embeddings,
+        # Keyed by embedding config too, since the store embeds with the caller's API key
+        cache_key = (
+            user_id,
+            self.settings.openai_api_key,
+            self.settings.embedding_model,
+            self.settings.embedding_dimensions,
         )
+        vector_store = _vector_stores.get(cache_key)
+        if vector_store is None:
+            # Use Firestore subcollection: users/{user_id}/chunks
+            collection_name = f"users/{user_id}/chunks"
+
+            vector_store = FirestoreVectorStore(
+                collection=collection_name,
+                embedding_service=self.embeddings,
+            )
+            _vector_stores.set(cache_key, vector_store)
+        return vector_store
 
     def get_retriever(self, user_id: str, class_id: str | None = None, k: int = 5):
         """Get LangChain retriever for document search."""
 
+        cache_key = (user_id, class_id, k)
+        if cache_key in self._retrievers:
+            return self._retrievers[cache_key]
+
         vector_store = self._get_vector_store(user_id)
 
         if class_id:
@@ -656,4 +1064,5 @@ class LangChainIngestionPipeline:
         else:
             search_kwargs = {"k": k}
 
-        return vector_store.as_retriever(search_kwargs=search_kwargs)
\ No newline at end of file
+        retriever = self._retrievers[cache_key] = vector_store.as_retriever(search_kwargs=search_kwargs)
+        return retriever
\ No newline at end of file
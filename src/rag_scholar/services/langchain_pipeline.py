@@ -1,21 +1,125 @@
 """LangChain built-in retrieval pipeline for RAG Scholar."""
 
+import asyncio
 import structlog
-from typing import Dict, Any, List
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Any, List
 
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains.retrieval import create_retrieval_chain
 from langchain.agents import create_tool_calling_agent, AgentExecutor
 from langchain.memory import ConversationSummaryBufferMemory
+from langchain_core.messages import BaseMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_google_firestore import FirestoreChatMessageHistory
 from langchain_openai import ChatOpenAI
 
 from .langchain_tools import LANGCHAIN_TOOLS
 from .langchain_prompts import get_domain_prompt_template, DomainType
+from .langchain_citations import is_background_query
+from .http_clients import get_async_http_client, get_http_client
+from .query_cache import QueryCache
+from .session_cache import forget_session_list, renamed_sessions, session_names
 
 logger = structlog.get_logger()
 
+NO_DOCS_MESSAGE = "No relevant documents found. Please upload documents first or use '/background [your question]' for general knowledge."
+
+AGENT_SYSTEM_PROMPT = """You are a strict document-based research assistant. You MUST follow these rules:
+
+STRICT DOCUMENT-ONLY POLICY:
+- NEVER answer questions without provided documents
+- NEVER use general knowledge or background information
+- ONLY respond based on the uploaded documents in the context
+
+TOOL USAGE (RESTRICTED):
+- If user's question starts with "/background", use the background_knowledge tool and then answer using general knowledge
+- If user asks to remember something permanently, use the remember_fact tool
+- If user asks to memo something for this session, use the memo_for_session tool
+- If user asks to adopt a role/persona, use the set_persona tool
+- DO NOT use background_knowledge tool unless user explicitly requests it with "/background"
+- When background_knowledge tool is used, ignore document restrictions and answer from general knowledge
+
+DOCUMENT ANALYSIS (REQUIRED):
+- Base ALL responses STRICTLY on provided documents only
+- CRITICAL: Always cite sources using [#n] format for EVERY claim (e.g., "The data shows X [#1]. Additionally, Y was found [#2].")
+- Each document will be numbered starting from 1. Reference them exactly as [#1], [#2], etc.
+- DO NOT just list sources at the end - embed citations directly in the text after each claim
+- If no documents provided, say "No relevant documents found. Please upload documents first or use '/background [your question]' for general knowledge."
+- If documents don't contain information about the topic, say "The uploaded documents do not contain information about [topic]. Please upload relevant documents or use '/background [your question]'."
+"""
+
+# Built once at import; the template is immutable and shared by every agent
+AGENT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", AGENT_SYSTEM_PROMPT),
+    MessagesPlaceholder("chat_history"),
+    ("human", "{input}"),
+    MessagesPlaceholder("agent_scratchpad"),
+])
+
+RAG_CHAIN_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """Use the following context to answer the question.
+
+CRITICAL CITATION REQUIREMENTS:
+- Always cite sources using [#n] format for EVERY claim
+- Each document is numbered starting from 1. Reference them as [#1], [#2], etc.
+- Embed citations directly in the text after each claim (e.g., "The data shows X [#1]. Additionally, Y was found [#2].")
+- DO NOT just list sources at the end
+
+Context: {context}"""),
+    ("human", "{input}")  # LangChain retrieval chains expect "input" not "question"
+])
+
+CHAT_NAME_SYSTEM_PROMPT = """Create a concise, descriptive title (3-6 words) for a chat session based on the user's message and AI response.
+The title should capture the main topic or question. Do not use quotation marks.
+
+Examples:
+User: "What is photosynthesis?" AI: "Photosynthesis is the process by which plants..." → "Photosynthesis Process"
+User: "How do I calculate derivatives?" AI: "To calculate derivatives in calculus..." → "Calculus Derivatives Guide"
+User: "Explain World War I causes" AI: "The main causes of World War I were..." → "World War I Causes"
+User: "Python error help" AI: "This error occurs when..." → "Python Error Fix"""
+
+
+# Generated chat names keyed by (naming model, naming context), so identical first
+# turns (retries, duplicate submissions) share one naming call
+_chat_name_cache = QueryCache(max_size=1024, ttl=3600)
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    """Return the tiktoken encoding for a model, falling back to cl100k_base."""
+    import tiktoken
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+@lru_cache(maxsize=8)
+def _get_summary_llm(api_key: str, model: str) -> ChatOpenAI:
+    """Build the memory summarization LLM once per API key and model."""
+    return ChatOpenAI(
+        api_key=api_key,
+        model=model,
+        temperature=0.0,  # Deterministic summaries
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+    )
+
+
+@lru_cache(maxsize=8)
+def _get_naming_llm(api_key: str, model: str, temperature: float, max_tokens: int) -> ChatOpenAI:
+    """Build the chat naming LLM once per API key and naming settings."""
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        openai_api_key=api_key,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+    )
+
 
 class LangChainRAGPipeline:
     """Production LangChain pipeline using only built-in components."""
@@ -28,6 +132,9 @@ class LangChainRAGPipeline:
             "api_key": settings.openai_api_key,
             "model": settings.chat_model,
             "temperature": settings.chat_temperature,
+            # Reuse pooled connections (TLS, HTTP/2) across per-request pipelines
+            "http_client": get_http_client(),
+            "http_async_client": get_async_http_client(),
         }
 
         # GPT-5 and newer models use max_completion_tokens instead of max_tokens
@@ -43,68 +150,71 @@ class LangChainRAGPipeline:
     def _create_agent(self):
         """Create tool-calling agent with built-in chains."""
 
-        # Create a strict document-only prompt for the agent
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a strict document-based research assistant. You MUST follow these rules:
-
-STRICT DOCUMENT-ONLY POLICY:
-- NEVER answer questions without provided documents
-- NEVER use general knowledge or background information
-- ONLY respond based on the uploaded documents in the context
-
-TOOL USAGE (RESTRICTED):
-- If user's question starts with "/background", use the background_knowledge tool and then answer using general knowledge
-- If user asks to remember something permanently, use the remember_fact tool
-- If user asks to memo something for this session, use the memo_for_session tool
-- If user asks to adopt a role/persona, use the set_persona tool
-- DO NOT use background_knowledge tool unless user explicitly requests it with "/background"
-- When background_knowledge tool is used, ignore document restrictions and answer from general knowledge
-
-DOCUMENT ANALYSIS (REQUIRED):
-- Base ALL responses STRICTLY on provided documents only
-- CRITICAL: Always cite sources using [#n] format for EVERY claim (e.g., "The data shows X [#1]. Additionally, Y was found [#2].")
-- Each document will be numbered starting from 1. Reference them exactly as [#1], [#2], etc.
-- DO NOT just list sources at the end - embed citations directly in the text after each claim
-- If no documents provided, say "No relevant documents found. Please upload documents first or use '/background [your question]' for general knowledge."
-- If documents don't contain information about the topic, say "The uploaded documents do not contain information about [topic]. Please upload relevant documents or use '/background [your question]'."
-"""),
-            MessagesPlaceholder("chat_history"),
-            ("human", "{input}"),
-            MessagesPlaceholder("agent_scratchpad"),
-        ])
-
         # Create agent with tools
-        agent = create_tool_calling_agent(self.llm, LANGCHAIN_TOOLS, prompt)
+        agent = create_tool_calling_agent(self.llm, LANGCHAIN_TOOLS, AGENT_PROMPT)
 
         return AgentExecutor(
             agent=agent,
             tools=LANGCHAIN_TOOLS,
-            verbose=True,
+            verbose=self.settings.debug,  # Step-by-step agent tracing only in debug mode
             handle_parsing_errors=True,
         )
 
+    @staticmethod
+    def _format_agent_input(question: str, context_docs: list[dict]) -> str:
+        """Append numbered context documents to the question in a single join."""
+        if not context_docs:
+            return question
+
+        parts = [question, "\n\nRelevant documents:"]
+        append = parts.append
+        for i, doc in enumerate(context_docs, 1):
+            append("\n[")
+            append(str(i))
+            append("] Source: ")
+            append(doc.get('source', 'Unknown'))
+            append("\n")
+            append(doc.get('content', ''))
+        return "".join(parts)
+
+    @staticmethod
+    def _merge_system_messages(messages: list[BaseMessage]) -> list[BaseMessage]:
+        """Fold stored MEMO/PERSONA system messages into one leading SystemMessage."""
+        facts = [m.content for m in messages if isinstance(m, SystemMessage)]
+        if not facts:
+            return messages
+
+        conversation = [m for m in messages if not isinstance(m, SystemMessage)]
+        return [SystemMessage(content="\n".join(facts)), *conversation]
+
+    def fit_context_budget(self, context_docs: list[dict]) -> list[dict]:
+        """Keep the highest-ranked context docs that fit within the context token budget."""
+        encoding = _get_encoding(self.settings.chat_model)
+        budget = self.settings.context_token_budget
+
+        kept = []
+        used = 0
+        for doc in context_docs:
+            tokens = len(encoding.encode(doc.get("content", "")))
+            if kept and used + tokens > budget:
+                break
+            kept.append(doc)
+            used += tokens
+
+        if len(kept) < len(context_docs):
+            logger.info("Context trimmed to token budget",
+                       kept=len(kept),
+                       dropped=len(context_docs) - len(kept),
+                       tokens=used)
+        return kept
+
     def _build_rag_chain(self, user_id: str = None, class_id: str = None):
         """Build proper retrieval chain using LangChain's create_retrieval_chain."""
 
         from .langchain_ingestion import LangChainIngestionPipeline
 
         # Create document chain for processing retrieved docs
-        system_prompt = """Use the following context to answer the question.
-
-CRITICAL CITATION REQUIREMENTS:
-- Always cite sources using [#n] format for EVERY claim
-- Each document is numbered starting from 1. Reference them as [#1], [#2], etc.
-- Embed citations directly in the text after each claim (e.g., "The data shows X [#1]. Additionally, Y was found [#2].")
-- DO NOT just list sources at the end
-
-Context: {context}"""
-
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", "{input}")  # LangChain retrieval chains expect "input" not "question"
-        ])
-
-        question_answer_chain = create_stuff_documents_chain(self.llm, prompt)
+        question_answer_chain = create_stuff_documents_chain(self.llm, RAG_CHAIN_PROMPT)
 
         # Get proper retriever if user_id provided
         if user_id:
@@ -130,56 +240,31 @@ Context: {context}"""
         """Chat using built-in LangChain agent with tools."""
 
         try:
-            # Create smart memory with summarization (ChatGPT-style)
-            # Use cheaper model for summarization to reduce costs
-            summary_llm = ChatOpenAI(
-                api_key=self.settings.openai_api_key,
-                model=self.settings.memory_summary_model,
-                temperature=0.0,  # Deterministic summaries
-            )
-
-            memory = ConversationSummaryBufferMemory(
-                llm=summary_llm,  # Use cost-optimized model for summaries
-                chat_memory=FirestoreChatMessageHistory(
-                    session_id=session_id,
-                    collection=f"users/{user_id}/chat_sessions"
-                ),
-                max_token_limit=self.settings.memory_max_token_limit,  # Configurable
-                return_messages=True,   # Compatible with agent
-                ai_prefix="Assistant",
-                human_prefix="User"
-            )
+            memory = self._create_memory(session_id, user_id)
 
-            # Check if we have any documents - if not, return strict message
-            if not context_docs:
-                no_docs_message = "No relevant documents found. Please upload documents first or use '/background [your question]' for general knowledge."
-
-                # Add to memory (will auto-summarize if needed)
-                memory.save_context({"input": question}, {"output": no_docs_message})
-
-                # Store session metadata even when no docs found and get generated name
-                generated_name = await self._store_session_metadata(user_id, session_id, class_id, question, no_docs_message, class_name, domain_type)
+            # Check if we have any documents - if not, return strict message (unless /background)
+            if not context_docs and not is_background_query(question):
+                # Save to memory (will auto-summarize if needed), then store session metadata
+                # even when no docs found, and get generated name. The history save replaces
+                # the session document, so the metadata write has to come after it.
+                await asyncio.to_thread(memory.save_context, {"input": question}, {"output": NO_DOCS_MESSAGE})
+                generated_name = await self._store_session_metadata(user_id, session_id, class_id, question, NO_DOCS_MESSAGE, class_name, domain_type)
 
                 return {
-                    "response": no_docs_message,
+                    "response": NO_DOCS_MESSAGE,
                     "session_id": session_id,
                     "sources": [],
                     "context_count": 0,
                     "chat_name": generated_name  # Include generated ChatGPT-style name
                 }
 
-            # Format context documents for the agent
-            formatted_docs = []
-            for i, doc in enumerate(context_docs, 1):
-                source = doc.get('source', 'Unknown')
-                content = doc.get('content', '')
-                formatted_docs.append(f"[{i}] Source: {source}\n{content}")
-            context_text = f"\n\nRelevant documents:\n{chr(10).join(formatted_docs)}"
+            # Drop lowest-ranked docs that would push the prompt past the token budget
+            context_docs = self.fit_context_budget(context_docs)
 
             # Prepare input for the agent
             agent_input = {
-                "input": f"{question}{context_text}",
-                "chat_history": memory.chat_memory.messages,
+                "input": self._format_agent_input(question, context_docs),
+                "chat_history": self._merge_system_messages(memory.chat_memory.messages),
             }
 
             # Run the agent
@@ -188,8 +273,6 @@ Context: {context}"""
             # Extract response content
             response_content = response.get("output", "")
 
-            # Add to memory (will auto-summarize if needed)
-            memory.save_context({"input": question}, {"output": response_content})
 
             # TODO: Store citation metadata separately if we have context docs
             # Temporarily disabled due to frontend compilation issues
@@ -219,7 +302,10 @@ Context: {context}"""
             #         logger.warning(f"Failed to store citation metadata: {e}")
             #         pass
 
-            # Store session metadata with class_id for filtering and get generated name
+            # Save to memory (will auto-summarize if needed), then store session metadata with
+            # class_id for filtering. The history save replaces the session document, so the
+            # metadata write has to come after it.
+            await asyncio.to_thread(memory.save_context, {"input": question}, {"output": response_content})
             generated_name = await self._store_session_metadata(user_id, session_id, class_id, question, response_content, class_name, domain_type)
 
             # Extract sources
@@ -252,6 +338,64 @@ Context: {context}"""
                 "context_count": 0
             }
 
+    async def stream_chat_with_history(
+        self,
+        question: str,
+        context_docs: list[dict],
+        session_id: str,
+        user_id: str,
+    ) -> AsyncIterator[str]:
+        """Stream the agent's answer token by token, saving the turn to memory once complete."""
+
+        memory = self._create_memory(session_id, user_id)
+
+        if not context_docs and not is_background_query(question):
+            await asyncio.to_thread(memory.save_context, {"input": question}, {"output": NO_DOCS_MESSAGE})
+            yield NO_DOCS_MESSAGE
+            return
+
+        agent_input = {
+            "input": self._format_agent_input(question, context_docs),
+            "chat_history": self._merge_system_messages(memory.chat_memory.messages),
+        }
+
+        # Forward model tokens as they arrive instead of waiting for the full completion
+        chunks = []
+        async for event in self.agent_executor.astream_events(agent_input, version="v2"):
+            if event["event"] != "on_chat_model_stream":
+                continue
+            content = event["data"]["chunk"].content
+            if content:
+                chunks.append(content)
+                yield content
+
+        response_content = "".join(chunks)
+        await asyncio.to_thread(memory.save_context, {"input": question}, {"output": response_content})
+
+        logger.info("RAG stream completed",
+                   session_id=session_id,
+                   user_id=user_id,
+                   context_count=len(context_docs),
+                   response_length=len(response_content))
+
+    def _create_memory(self, session_id: str, user_id: str) -> ConversationSummaryBufferMemory:
+        """Create smart memory with summarization (ChatGPT-style) backed by Firestore."""
+
+        # Use cheaper model for summarization to reduce costs
+        summary_llm = _get_summary_llm(self.settings.openai_api_key, self.settings.memory_summary_model)
+
+        return ConversationSummaryBufferMemory(
+            llm=summary_llm,  # Use cost-optimized model for summaries
+            chat_memory=FirestoreChatMessageHistory(
+                session_id=session_id,
+                collection=f"users/{user_id}/chat_sessions"
+            ),
+            max_token_limit=self.settings.memory_max_token_limit,  # Configurable
+            return_messages=True,   # Compatible with agent
+            ai_prefix="Assistant",
+            human_prefix="User"
+        )
+
     async def simple_chat(self, question: str, user_id: str = None, class_id: str = None, context_docs: list[dict] = None) -> str:
         """Simple chat using proper LangChain retrieval chain."""
 
@@ -281,26 +425,8 @@ Context: {context}"""
     async def _generate_chat_name(self, question: str, response: str = None) -> str:
         """Generate a concise, descriptive name for the chat based on the user's question and AI response."""
         try:
-            from langchain_openai import ChatOpenAI
             from langchain.schema import HumanMessage, SystemMessage
 
-            # Use configurable fast, cheap model for naming (ChatGPT-style)
-            llm = ChatOpenAI(
-                model=self.settings.naming_model,
-                temperature=self.settings.naming_temperature,
-                max_tokens=self.settings.naming_max_tokens,
-                openai_api_key=self.settings.openai_api_key,
-            )
-
-            system_prompt = """Create a concise, descriptive title (3-6 words) for a chat session based on the user's message and AI response.
-The title should capture the main topic or question. Do not use quotation marks.
-
-Examples:
-User: "What is photosynthesis?" AI: "Photosynthesis is the process by which plants..." → "Photosynthesis Process"
-User: "How do I calculate derivatives?" AI: "To calculate derivatives in calculus..." → "Calculus Derivatives Guide"
-User: "Explain World War I causes" AI: "The main causes of World War I were..." → "World War I Causes"
-User: "Python error help" AI: "This error occurs when..." → "Python Error Fix"""
-
             # Build context from both user question and AI response (if available)
             context = f"User's message: {question}"
             if response:
@@ -308,18 +434,33 @@ User: "Python error help" AI: "This error occurs when..." → "Python Error Fix"
                 truncated_response = response[:200] + "..." if len(response) > 200 else response
                 context += f"\nAI response: {truncated_response}"
 
+            cache_key = (self.settings.naming_model, context)
+            cached_name = _chat_name_cache.get(cache_key)
+            if cached_name is not None:
+                return cached_name
+
+            # Use configurable fast, cheap model for naming (ChatGPT-style)
+            llm = _get_naming_llm(
+                self.settings.openai_api_key,
+                self.settings.naming_model,
+                self.settings.naming_temperature,
+                self.settings.naming_max_tokens,
+            )
+
             messages = [
-                SystemMessage(content=system_prompt),
+                SystemMessage(content=CHAT_NAME_SYSTEM_PROMPT),
                 HumanMessage(content=context)
             ]
 
-            response = await llm.ainvoke(messages)
+            # A slow naming call must not hold up the chat turn; timing out falls back below
+            response = await asyncio.wait_for(llm.ainvoke(messages), timeout=self.settings.naming_timeout)
             generated_name = response.content.strip()
 
             # Fallback if generation fails or is too long
             if not generated_name or len(generated_name) > 50:
                 return question[:40] + "..." if len(question) > 40 else question
 
+            _chat_name_cache.set(cache_key, generated_name)
             return generated_name
 
         except Exception as e:
@@ -327,37 +468,48 @@ User: "Python error help" AI: "This error occurs when..." → "Python Error Fix"
             # Fallback to simple truncation
             return question[:40] + "..." if len(question) > 40 else question
 
-    async def _store_session_metadata(self, user_id: str, session_id: str, class_id: str, question: str, response: str = None, class_name: str = None, domain_type: str = None) -> str:
-        """Store session metadata for filtering and organization. Returns the chat name."""
+    async def _store_session_metadata(self, user_id: str, session_id: str, class_id: str, question: str, response: str = None, class_name: str = None, domain_type: str = None, generate_name: bool = True) -> str:
+        """Store session metadata for filtering and organization. Returns the chat name.
+
+        FirestoreChatMessageHistory saves with a full set() on this same session document,
+        which drops these fields, so callers run this after the history write and every
+        field is merged back on each turn.
+
+        With generate_name=False (greetings and other canned replies) the LLM naming call is
+        skipped and a short placeholder name is used; it gets regenerated on a later turn.
+        """
         try:
             from google.cloud import firestore
             from datetime import datetime, timezone
 
             db = firestore.Client(project=self.settings.google_cloud_project)
             session_ref = db.collection(f"users/{user_id}/chat_sessions").document(session_id)
+            now = datetime.now(timezone.utc).isoformat()
+
+            # A cached (name, created_at) spares the read below, never the write
+            cache_key = (user_id, session_id)
+            cached = session_names.get(cache_key)
 
-            # Check if session document exists, if not create it
-            session_doc = session_ref.get()
-            if not session_doc.exists:
+            if cached is not None:
+                current_name, created_at = cached
+                is_new = False
+            else:
+                session_doc = await asyncio.to_thread(session_ref.get)
+                session_data = session_doc.to_dict() or {}
+                is_new = not session_doc.exists
+                current_name = session_data.get("name", "Chat")
+                created_at = session_data.get("created_at", now)
+                if "name" not in session_data:
+                    # The stored name was lost, so an earlier regeneration no longer counts
+                    renamed_sessions.invalidate(lambda key: key == cache_key)
+
+            if is_new:
                 # Generate a better name using LLM (ChatGPT-style)
-                chat_name = await self._generate_chat_name(question, response)
-
-                # Create new session with metadata
-                session_data = {
-                    "created_at": datetime.now(timezone.utc).isoformat(),
-                    "updated_at": datetime.now(timezone.utc).isoformat(),
-                    "class_id": class_id,
-                    "class_name": class_name,
-                    "domain": domain_type,
-                    "name": chat_name,
-                }
-                session_ref.set(session_data)
-                return chat_name
+                if generate_name:
+                    current_name = await self._generate_chat_name(question, response)
+                else:
+                    current_name = question[:40] + "..." if len(question) > 40 else question
             else:
-                # Update existing session - always update timestamp when new message added
-                existing_data = session_doc.to_dict()
-                current_name = existing_data.get("name", "Chat")
-
                 # Optionally regenerate name if current name seems generic/incomplete
                 # This helps improve session names as conversations develop
                 should_regenerate = (
@@ -365,25 +517,29 @@ User: "Python error help" AI: "This error occurs when..." → "Python Error Fix"
                     current_name.endswith("...") or
                     len(current_name) < 10 or
                     current_name.startswith("Chat ")
-                )
-
-                update_data = {
-                    "updated_at": datetime.now(timezone.utc).isoformat(),
-                    "class_id": class_id,  # Update class_id in case it changed
-                    "class_name": class_name,  # Update class_name in case it changed
-                    "domain": domain_type,  # Update domain in case it changed
-                }
+                ) and renamed_sessions.get(cache_key) is None
 
-                if should_regenerate and response:
+                if should_regenerate and response and generate_name:
                     # Generate a better name using the latest conversation context
                     new_name = await self._generate_chat_name(question, response)
+                    renamed_sessions.set(cache_key, True)
                     if new_name and new_name != current_name:
-                        update_data["name"] = new_name
+                        logger.info("Updated session name", session_id=session_id, old_name=current_name, new_name=new_name)
                         current_name = new_name
-                        logger.info("Updated session name", session_id=session_id, old_name=existing_data.get("name"), new_name=new_name)
 
-                session_ref.update(update_data)
-                return current_name
+            # Always update the timestamp, and write the name, creation time and class back
+            # with them in case the history save dropped them
+            await asyncio.to_thread(session_ref.set, {
+                "created_at": created_at,
+                "updated_at": now,
+                "class_id": class_id,
+                "class_name": class_name,
+                "domain": domain_type,
+                "name": current_name,
+            }, merge=True)
+            session_names.set(cache_key, (current_name, created_at))
+            forget_session_list(user_id)
+            return current_name
 
         except Exception as e:
             logger.error("Failed to store session metadata", error=str(e), session_id=session_id)
@@ -1,17 +1,8 @@
 """LangChain prompt templates to replace custom domains."""
 
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from enum import Enum
 
-
-class DomainType(str, Enum):
-    """Research domain types."""
-    GENERAL = "general"
-    LAW = "law"
-    MEDICINE = "medicine"
-    SCIENCE = "science"
-    BUSINESS = "business"
-    HUMANITIES = "humanities"
+from ..config.settings import DomainType
 
 
 # Domain-specific system prompts
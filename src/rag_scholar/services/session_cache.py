@@ -0,0 +1,28 @@
+"""Process-wide cache of chat session names, shared by the chat pipeline and session routes."""
+
+from .query_cache import QueryCache
+
+# (name, created_at) keyed by (user_id, session_id); a hit means the session document
+# exists, so chat turns can skip reading it back before rewriting its metadata
+session_names = QueryCache(max_size=4096, ttl=300)
+
+# Sessions keyed by (user_id, session_id) whose generic name was already regenerated
+# once; a name that still looks generic is kept rather than re-asking the LLM every turn
+renamed_sessions = QueryCache(max_size=4096, ttl=3600)
+
+
+# GET /sessions responses keyed by user_id; clients poll the list, so a short TTL
+# absorbs bursts while chat turns, renames and deletes drop it explicitly
+session_lists = QueryCache(max_size=1024, ttl=5)
+
+
+def forget_session_list(user_id: str) -> None:
+    """Drop the cached session listing after any of the user's sessions change."""
+    session_lists.invalidate(lambda key: key == user_id)
+
+
+def forget_session(user_id: str, session_id: str) -> None:
+    """Drop the cached name after a session is renamed or deleted."""
+    session_names.invalidate(lambda key: key == (user_id, session_id))
+    renamed_sessions.invalidate(lambda key: key == (user_id, session_id))
+    forget_session_list(user_id)
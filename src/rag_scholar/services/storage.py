@@ -1,10 +1,12 @@
 """Firebase Storage service for document storage and preview generation."""
 
+import asyncio
 import structlog
 from google.cloud import storage
-from typing import Optional, Tuple
+from typing import BinaryIO, Optional, Tuple
 import io
 from datetime import timedelta
+from functools import lru_cache
 
 logger = structlog.get_logger()
 
@@ -18,9 +20,29 @@ class DocumentStorageService:
         self.bucket_name = f"{settings.google_cloud_project}.appspot.com"
         self.bucket = self.storage_client.bucket(self.bucket_name)
 
+    def _upload_blob(self, storage_path: str, content: bytes | BinaryIO, content_type: str, metadata: dict) -> str:
+        """Blocking upload of content with metadata; returns a 7-day signed download URL."""
+        blob = self.bucket.blob(storage_path)
+
+        # Metadata set before upload is sent with the object, saving a separate patch() request
+        blob.metadata = metadata
+
+        if isinstance(content, bytes):
+            blob.upload_from_string(content, content_type=content_type)
+        else:
+            # Stream file objects (e.g. an UploadFile spool) in chunks instead of copying to bytes
+            blob.upload_from_file(content, rewind=True, content_type=content_type)
+
+        # Generate signed URL (valid for 7 days)
+        return blob.generate_signed_url(
+            version="v4",
+            expiration=timedelta(days=7),
+            method="GET"
+        )
+
     async def upload_document(
         self,
-        file_content: bytes,
+        file_content: bytes | BinaryIO,
         filename: str,
         user_id: str,
         document_id: str,
@@ -36,26 +58,17 @@ class DocumentStorageService:
             # Create storage path
             storage_path = f"users/{user_id}/documents/{document_id}/original"
 
-            # Upload to Firebase Storage
-            blob = self.bucket.blob(storage_path)
-            blob.upload_from_string(
+            # Upload to Firebase Storage off the event loop
+            download_url = await asyncio.to_thread(
+                self._upload_blob,
+                storage_path,
                 file_content,
-                content_type=content_type
-            )
-
-            # Set metadata
-            blob.metadata = {
-                "filename": filename,
-                "user_id": user_id,
-                "document_id": document_id
-            }
-            blob.patch()
-
-            # Generate signed URL (valid for 7 days)
-            download_url = blob.generate_signed_url(
-                version="v4",
-                expiration=timedelta(days=7),
-                method="GET"
+                content_type,
+                {
+                    "filename": filename,
+                    "user_id": user_id,
+                    "document_id": document_id
+                },
             )
 
             storage_url = f"gs://{self.bucket_name}/{storage_path}"
@@ -92,26 +105,17 @@ class DocumentStorageService:
             # Create storage path for preview
             storage_path = f"users/{user_id}/documents/{document_id}/preview"
 
-            # Upload preview
-            blob = self.bucket.blob(storage_path)
-            blob.upload_from_string(
+            # Upload preview off the event loop
+            download_url = await asyncio.to_thread(
+                self._upload_blob,
+                storage_path,
                 preview_content,
-                content_type=content_type
-            )
-
-            # Set metadata
-            blob.metadata = {
-                "user_id": user_id,
-                "document_id": document_id,
-                "is_preview": "true"
-            }
-            blob.patch()
-
-            # Generate signed URL (valid for 7 days)
-            download_url = blob.generate_signed_url(
-                version="v4",
-                expiration=timedelta(days=7),
-                method="GET"
+                content_type,
+                {
+                    "user_id": user_id,
+                    "document_id": document_id,
+                    "is_preview": "true"
+                },
             )
 
             storage_url = f"gs://{self.bucket_name}/{storage_path}"
@@ -146,6 +150,11 @@ class DocumentStorageService:
         Returns:
             Preview PDF content as bytes, or None if generation fails
         """
+        # PDF parsing is CPU-bound; keep it off the event loop
+        return await asyncio.to_thread(self._build_pdf_preview, file_content, max_pages)
+
+    def _build_pdf_preview(self, file_content: bytes, max_pages: int) -> Optional[bytes]:
+        """Blocking PyPDF2 preview extraction for generate_pdf_preview."""
         try:
             import PyPDF2
 
@@ -186,16 +195,19 @@ class DocumentStorageService:
         document_id: str
     ) -> bool:
         """Delete document and preview from Firebase Storage."""
+        from google.api_core.exceptions import NotFound
+
         try:
-            # Delete original
-            original_blob = self.bucket.blob(f"users/{user_id}/documents/{document_id}/original")
-            if original_blob.exists():
-                original_blob.delete()
+            # Delete original and preview directly; a missing blob is not an error,
+            # so skip the exists() round-trip per blob
+            def delete_blobs():
+                for name in ("original", "preview"):
+                    try:
+                        self.bucket.blob(f"users/{user_id}/documents/{document_id}/{name}").delete()
+                    except NotFound:
+                        pass
 
-            # Delete preview
-            preview_blob = self.bucket.blob(f"users/{user_id}/documents/{document_id}/preview")
-            if preview_blob.exists():
-                preview_blob.delete()
+            await asyncio.to_thread(delete_blobs)
 
             logger.info("Deleted document from storage",
                        user_id=user_id,
@@ -231,3 +243,11 @@ class DocumentStorageService:
         except Exception as e:
             logger.error("Failed to generate download URL", error=str(e))
             return ""
+
+
+@lru_cache(maxsize=1)
+def get_storage_service() -> DocumentStorageService:
+    """Process-wide DocumentStorageService, also usable as a FastAPI dependency."""
+    from ..config.settings import get_settings
+
+    return DocumentStorageService(get_settings())
@@ -2,6 +2,7 @@
 
 import structlog
 from datetime import datetime
+from functools import lru_cache
 from google.cloud import firestore
 from typing import Dict, List, Optional
 
@@ -59,7 +60,7 @@ class UserProfileService:
             if calculated_points > stored_points:
                 stats_data["total_points"] = calculated_points
                 stats_ref = self.db.collection(f"users/{user_id}/stats").document("main")
-                stats_ref.set(stats_data)
+                stats_ref.set({"total_points": calculated_points}, merge=True)
 
             return {
                 "profile": profile_data,
@@ -147,24 +148,29 @@ class UserProfileService:
                 doc = stats_ref.get()
 
             stats = doc.to_dict() or {}
+            now = datetime.utcnow()
 
             # Special handling for early adopter status
             if stat_name == "is_early_adopter":
                 # Set directly, don't increment
                 stats["is_early_adopter"] = increment
+                stat_update = increment
             else:
-                # Update the specific stat normally
-                if stat_name in stats:
-                    stats[stat_name] += increment
-                else:
-                    stats[stat_name] = increment
+                # Increment atomically in Firestore; mirror it locally for the achievement check
+                stats[stat_name] = stats.get(stat_name, 0) + increment
+                stat_update = firestore.Increment(increment)
 
             # Update last activity
-            stats["last_activity"] = datetime.utcnow()
-            stats["updated_at"] = datetime.utcnow()
+            stats["last_activity"] = now
+            stats["updated_at"] = now
 
-            # Update stats document
-            stats_ref.set(stats)
+            # Write only the changed fields instead of rewriting the whole stats document;
+            # merge creates the document if it is still missing
+            stats_ref.set({
+                stat_name: stat_update,
+                "last_activity": now,
+                "updated_at": now,
+            }, merge=True)
 
             # Check for achievements
             await self._check_achievements(user_id, stats)
@@ -290,22 +296,23 @@ class UserProfileService:
     async def _add_points_to_stats(self, user_id: str, points: int) -> bool:
         """Add points to user's total points without triggering achievement check."""
         try:
+            from google.api_core.exceptions import NotFound
+
             stats_ref = self.db.collection(f"users/{user_id}/stats").document("main")
-            doc = stats_ref.get()
 
-            if doc.exists:
-                stats = doc.to_dict() or {}
-                current_points = stats.get("total_points", 0)
-                stats["total_points"] = current_points + points
-                stats["updated_at"] = datetime.utcnow()
-                stats_ref.set(stats)
-
-                logger.info("Added points to user",
-                           user_id=user_id,
-                           points_added=points,
-                           total_points=stats["total_points"])
-                return True
-            return False
+            # Single atomic write; update() fails with NotFound when there is no stats document
+            try:
+                stats_ref.update({
+                    "total_points": firestore.Increment(points),
+                    "updated_at": datetime.utcnow(),
+                })
+            except NotFound:
+                return False
+
+            logger.info("Added points to user",
+                       user_id=user_id,
+                       points_added=points)
+            return True
         except Exception as e:
             logger.error("Failed to add points", user_id=user_id, error=str(e))
             return False
@@ -325,7 +332,10 @@ class UserProfileService:
                     domains_explored.append(domain_id)
                     stats["domains_explored"] = domains_explored
                     stats["updated_at"] = datetime.utcnow()
-                    stats_ref.set(stats)
+                    stats_ref.set({
+                        "domains_explored": firestore.ArrayUnion([domain_id]),
+                        "updated_at": stats["updated_at"],
+                    }, merge=True)
 
                     # Check for domain explorer achievement
                     await self._check_achievements(user_id, stats)
@@ -376,7 +386,12 @@ class UserProfileService:
 
                     stats["last_activity_date"] = today.isoformat()
                     stats["updated_at"] = datetime.utcnow()
-                    stats_ref.set(stats)
+                    stats_ref.set({
+                        "research_days": firestore.Increment(1),
+                        "streak_days": stats["streak_days"],
+                        "last_activity_date": stats["last_activity_date"],
+                        "updated_at": stats["updated_at"],
+                    }, merge=True)
 
                     # Check for streak achievements
                     await self._check_achievements(user_id, stats)
@@ -419,7 +434,11 @@ class UserProfileService:
 
                 if updated:
                     stats["updated_at"] = datetime.utcnow()
-                    stats_ref.set(stats)
+                    stats_ref.set({
+                        key: stats[key]
+                        for key in ("early_bird_unlocked", "night_owl_unlocked", "updated_at")
+                        if key in stats
+                    }, merge=True)
                     # Check achievements
                     await self._check_achievements(user_id, stats)
 
@@ -522,4 +541,12 @@ class UserProfileService:
 
         except Exception as e:
             logger.error("Failed to update user profile data", user_id=user_id, error=str(e))
-            return False
\ No newline at end of file
+            return False
+
+
+@lru_cache(maxsize=1)
+def get_user_profile_service() -> UserProfileService:
+    """Process-wide UserProfileService, also usable as a FastAPI dependency."""
+    from ..config.settings import get_settings
+
+    return UserProfileService(get_settings())
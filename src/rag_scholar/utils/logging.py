@@ -1,10 +1,15 @@
 """Logging configuration utilities."""
 
 import logging
+import os
 import sys
 
 import structlog
 
+# Read once at import: detailed debug payloads (per-item listings) are only
+# built when RAG_DEBUG=1, so hot endpoints skip constructing them entirely
+DEBUG_DETAILS = os.environ.get("RAG_DEBUG") == "1"
+
 
 def setup_logging(log_level: str = "INFO") -> None:
     """Configure structured logging."""
@@ -0,0 +1,51 @@
+"""Test the SQLite embedding byte store."""
+
+from rag_scholar.services.embedding_store import (
+    SQLiteByteStore,
+    decode_float16,
+    embedding_cache_key,
+    encode_float16,
+)
+
+
+class TestSQLiteByteStore:
+    """Test persistence and lookup in SQLiteByteStore."""
+
+    def test_mget_returns_values_in_key_order(self, tmp_path):
+        """Test stored values come back in request order with None for misses."""
+        store = SQLiteByteStore(tmp_path / "emb.sqlite")
+        store.mset([("a", b"1"), ("b", b"2")])
+
+        assert store.mget(["b", "missing", "a"]) == [b"2", None, b"1"]
+
+    def test_values_persist_across_instances(self, tmp_path):
+        """Test a reopened store sees earlier writes."""
+        path = tmp_path / "cache" / "emb.sqlite"
+        SQLiteByteStore(path).mset([("key", b"value")])
+
+        assert SQLiteByteStore(path).mget(["key"]) == [b"value"]
+
+    def test_mdelete_and_yield_keys(self, tmp_path):
+        """Test deleting keys and listing by prefix."""
+        store = SQLiteByteStore(tmp_path / "emb.sqlite")
+        store.mset([("model:a", b"1"), ("model:b", b"2"), ("other:c", b"3")])
+        store.mdelete(["model:a"])
+
+        assert sorted(store.yield_keys(prefix="model:")) == ["model:b"]
+
+
+class TestEmbeddingEncoding:
+    """Test embedding keys and float16 packing."""
+
+    def test_float16_round_trip(self):
+        """Test vectors survive packing at half precision."""
+        vector = [0.125, -0.5, 0.0]
+        packed = encode_float16(vector)
+
+        assert len(packed) == 2 * len(vector)
+        assert decode_float16(packed) == vector
+
+    def test_cache_key_depends_on_namespace(self):
+        """Test the same text under different models gets different keys."""
+        assert embedding_cache_key("m1", "text") == embedding_cache_key("m1", "text")
+        assert embedding_cache_key("m1", "text") != embedding_cache_key("m2", "text")
@@ -0,0 +1,126 @@
+"""Test citation extraction and query classification."""
+
+import re
+
+import pytest
+
+from rag_scholar.services.langchain_citations import (
+    _CONVERSATIONAL_PATTERNS,
+    extract_citations_from_response,
+    is_background_query,
+    is_conversational_query,
+)
+
+CONVERSATIONAL = [
+    "hi", "Hello", "HEY!", "  howdy.  ", "how are you?", "How're you",
+    "what's up", "hows it going?!", "Good morning!", "good night.",
+    "thanks", "Thank you!", "thx", "ty.", "you're welcome", "no problem",
+    "yes", "OK.", "sure!", "nope", "bye", "See you!", "later",
+]
+NEAR_MISSES = [
+    "hello, what is a join?", "hi there", "thanks for explaining normal forms, what is BCNF?",
+    "how are you computing the gradient?", "yes or no: is SQL declarative?",
+    "good morning routine studies", "okay so what is a foreign key", "history of goodbye letters",
+    "thank", "hey hey", "bye.\nwhat about indexes?",
+]
+
+
+def _docs(*sources):
+    return [
+        {"source": source, "content": f"Content of {source}", "metadata": {"page": index}}
+        for index, source in enumerate(sources, 1)
+    ]
+
+
+class TestExtractCitations:
+    """Test extract_citations_from_response."""
+
+    def test_markers_resolve_to_one_indexed_docs(self):
+        """Test [#n] markers map to context_docs[n - 1] and become [CITE:n]."""
+        result = extract_citations_from_response(
+            "Joins combine tables [#2]. Keys identify rows [#1].",
+            _docs("a.pdf", "b.pdf"),
+        )
+
+        assert result["response"] == "Joins combine tables [CITE:2]. Keys identify rows [CITE:1]."
+        assert [c["id"] for c in result["citations"]] == [1, 2]
+        assert [c["source"] for c in result["citations"]] == ["a.pdf", "b.pdf"]
+        assert result["sources"] == ["b.pdf", "a.pdf"]
+
+    def test_zero_marker_is_dropped(self):
+        """Test [#0] no longer resolves to the last document."""
+        result = extract_citations_from_response("Joins combine tables [#0].", _docs("a.pdf", "b.pdf"))
+
+        assert result["citations"] == []
+        assert result["sources"] == []
+
+    def test_out_of_range_markers_are_dropped(self):
+        """Test ids beyond the retrieved documents are ignored, valid ones kept."""
+        result = extract_citations_from_response(
+            "Joins combine tables [#7]. Keys identify rows [#1].",
+            _docs("a.pdf"),
+        )
+
+        assert [c["id"] for c in result["citations"]] == [1]
+        assert result["sources"] == ["a.pdf"]
+
+    def test_repeated_markers_produce_one_citation(self):
+        """Test a document cited several times yields a single citation."""
+        result = extract_citations_from_response(
+            "Joins combine tables [#1]. Keys identify rows [#1].",
+            _docs("a.pdf"),
+        )
+
+        assert [c["id"] for c in result["citations"]] == [1]
+
+    def test_automatic_citations_when_llm_omits_markers(self):
+        """Test markers are added and re-scanned when the answer cites nothing."""
+        result = extract_citations_from_response(
+            "Joins combine rows from two tables. Keys uniquely identify each row.",
+            _docs("a.pdf", "b.pdf"),
+        )
+
+        assert result["response"] == (
+            "Joins combine rows from two tables [CITE:1]. Keys uniquely identify each row [CITE:2]."
+        )
+        assert [c["id"] for c in result["citations"]] == [1, 2]
+
+    def test_no_context_docs(self):
+        """Test nothing is cited or added without retrieved documents."""
+        result = extract_citations_from_response("Joins combine rows from two tables.", [])
+
+        assert result["response"] == "Joins combine rows from two tables."
+        assert result["citations"] == []
+        assert result["grouped_sources"] == []
+
+
+class TestConversationalQuery:
+    """Test is_conversational_query and is_background_query."""
+
+    @pytest.mark.parametrize("query", CONVERSATIONAL)
+    def test_greetings_and_thanks_match(self, query):
+        """Test short social messages skip retrieval."""
+        assert is_conversational_query(query)
+
+    @pytest.mark.parametrize("query", NEAR_MISSES)
+    def test_near_misses_go_to_retrieval(self, query):
+        """Test questions that merely start with a greeting are not conversational."""
+        assert not is_conversational_query(query)
+
+    @pytest.mark.parametrize("query", CONVERSATIONAL + NEAR_MISSES)
+    def test_matches_old_pattern_loop(self, query):
+        """Test the fused regex agrees with trying each pattern on the lower-cased query."""
+        expected = any(re.match(pattern, query.strip().lower()) for pattern in _CONVERSATIONAL_PATTERNS)
+
+        assert is_conversational_query(query) == expected
+
+    def test_empty_query(self):
+        """Test empty input is not conversational."""
+        assert not is_conversational_query("")
+        assert not is_conversational_query("   ")
+
+    def test_background_prefix(self):
+        """Test /background is detected case-insensitively after leading whitespace."""
+        assert is_background_query("  /Background what is entropy?")
+        assert not is_background_query("what is /background?")
+        assert not is_background_query("")
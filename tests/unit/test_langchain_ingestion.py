@@ -0,0 +1,103 @@
+"""Test document parsing and chunking in the ingestion pipeline."""
+
+from types import SimpleNamespace
+
+from langchain_community.document_loaders import CSVLoader, TextLoader
+from langchain_core.documents import Document
+
+from rag_scholar.services.langchain_ingestion import (
+    LangChainIngestionPipeline,
+    _get_text_splitter,
+    _load_from_bytes,
+)
+
+CSV_CONTENT = (
+    "name, score ,notes\n"
+    "Ada,  91 ,\"likes, commas\"\n"
+    "Grace,88,\"multi\nline\"\n"
+    "Linus,75\n"
+    "Alan,80,x,extra\n"
+).encode("utf-8")
+
+
+def _pipeline(chunk_size: int = 200, chunk_overlap: int = 20) -> LangChainIngestionPipeline:
+    """Build a pipeline with only the chunking state, skipping embeddings and Firestore clients."""
+    pipeline = object.__new__(LangChainIngestionPipeline)
+    pipeline.settings = SimpleNamespace(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    pipeline.text_splitter = _get_text_splitter(chunk_size, chunk_overlap)
+    return pipeline
+
+
+class TestSplitDocuments:
+    """Test _split_documents."""
+
+    def test_short_documents_pass_through_unsplit(self):
+        """Test under-threshold docs keep their text and metadata as one chunk."""
+        doc = Document(page_content="A join combines rows.", metadata={"source": "a.pdf", "page": 3})
+
+        chunks = _pipeline()._split_documents([doc])
+
+        assert len(chunks) == 1
+        assert chunks[0].page_content == "A join combines rows."
+        assert chunks[0].metadata == {"source": "a.pdf", "page": 3, "start_index": 0}
+        assert doc.metadata == {"source": "a.pdf", "page": 3}
+
+    def test_bypass_matches_splitter_output(self):
+        """Test the bypass gives the same chunk the splitter would, including start_index."""
+        pipeline = _pipeline()
+        doc = Document(page_content="\n  Keys identify rows.  \n", metadata={"source": "b.txt"})
+
+        assert pipeline._split_documents([doc]) == pipeline.text_splitter.split_documents([doc])
+
+    def test_blank_documents_are_dropped(self):
+        """Test whitespace-only docs produce no chunks, as with the splitter."""
+        assert _pipeline()._split_documents([Document(page_content=" \n ", metadata={})]) == []
+
+    def test_long_documents_are_still_split(self):
+        """Test docs over chunk_size go through the splitter with metadata on every chunk."""
+        pipeline = _pipeline(chunk_size=50, chunk_overlap=0)
+        doc = Document(page_content="word " * 40, metadata={"source": "c.md"})
+
+        chunks = pipeline._split_documents([doc])
+
+        assert len(chunks) > 1
+        assert chunks == pipeline.text_splitter.split_documents([doc])
+        assert all(len(chunk.page_content) <= 50 for chunk in chunks)
+        assert all(chunk.metadata["source"] == "c.md" for chunk in chunks)
+
+
+class TestLoadFromBytes:
+    """Test in-memory TXT and CSV parsing against the path-based loaders."""
+
+    def test_csv_rows_match_csv_loader(self, tmp_path):
+        """Test one Document per row with the same content and row metadata as CSVLoader."""
+        path = tmp_path / "grades.csv"
+        path.write_bytes(CSV_CONTENT)
+        expected = CSVLoader(str(path), encoding="utf-8").load()
+
+        documents = _load_from_bytes(CSV_CONTENT, "grades.csv", ".csv")
+
+        assert [doc.page_content for doc in documents] == [doc.page_content for doc in expected]
+        assert [doc.metadata["row"] for doc in documents] == [doc.metadata["row"] for doc in expected]
+        assert all(doc.metadata["source"] == "grades.csv" for doc in documents)
+
+    def test_txt_matches_text_loader(self, tmp_path):
+        """Test a text upload becomes one Document with the upload name as source."""
+        content = "Line one\r\nLine two\n\nünïcode".encode("utf-8")
+        path = tmp_path / "notes.txt"
+        path.write_bytes(content)
+        expected = TextLoader(str(path), encoding="utf-8").load()
+
+        documents = _load_from_bytes(content, "notes.txt", ".txt")
+
+        assert [doc.page_content for doc in documents] == [doc.page_content for doc in expected]
+        assert documents[0].metadata == {"source": "notes.txt"}
+
+    def test_non_utf8_falls_back_to_path_loader(self):
+        """Test undecodable uploads return None so the tempfile loader handles them."""
+        assert _load_from_bytes("café".encode("latin-1"), "notes.txt", ".txt") is None
+        assert _load_from_bytes("a,b\ncafé,1".encode("latin-1"), "data.csv", ".csv") is None
+
+    def test_other_extensions_are_not_parsed_in_memory(self):
+        """Test unsupported in-memory formats return None."""
+        assert _load_from_bytes(b"# Title", "readme.md", ".md") is None
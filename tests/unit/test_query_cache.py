@@ -0,0 +1,47 @@
+"""Test the retrieval query cache."""
+
+from rag_scholar.services.query_cache import QueryCache
+
+
+class TestQueryCache:
+    """Test LRU and TTL behaviour of QueryCache."""
+
+    def test_get_returns_cached_value(self):
+        """Test a stored value is returned and counted as a hit."""
+        cache = QueryCache(max_size=2, ttl=60)
+        cache.set(("user", None, "query", 5), ["doc"])
+
+        assert cache.get(("user", None, "query", 5)) == ["doc"]
+        assert cache.get(("user", None, "other", 5)) is None
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest untouched entry is evicted when full."""
+        cache = QueryCache(max_size=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_expired_entries_are_dropped(self):
+        """Test entries older than the TTL are treated as misses."""
+        cache = QueryCache(max_size=2, ttl=-1)
+        cache.set("a", 1)
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_invalidate_by_predicate(self):
+        """Test invalidation removes only matching keys."""
+        cache = QueryCache()
+        cache.set(("alice", None, "q", 5), 1)
+        cache.set(("bob", None, "q", 5), 2)
+
+        assert cache.invalidate(lambda key: key[0] == "alice") == 1
+        assert cache.get(("alice", None, "q", 5)) is None
+        assert cache.get(("bob", None, "q", 5)) == 2
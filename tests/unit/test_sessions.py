@@ -0,0 +1,43 @@
+"""Test chat session listing helpers."""
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from rag_scholar.routes.sessions import _message_preview
+
+
+class TestMessagePreview:
+    """Test _message_preview on stored chat history entries."""
+
+    def test_encoded_human_message(self):
+        """Test bytes as written by FirestoreChatMessageHistory are decoded."""
+        raw = str.encode(HumanMessage(content="What is a join?").model_dump_json())
+
+        assert _message_preview(raw) == "What is a join?"
+
+    def test_plain_str_message(self):
+        """Test unencoded JSON strings are accepted too."""
+        assert _message_preview(HumanMessage(content="What is a join?").model_dump_json()) == "What is a join?"
+
+    def test_long_content_is_truncated(self):
+        """Test previews are cut to 50 characters plus an ellipsis."""
+        raw = str.encode(HumanMessage(content="x" * 80).model_dump_json())
+
+        assert _message_preview(raw) == "x" * 50 + "..."
+
+    def test_ai_message_has_no_preview(self):
+        """Test only the user's messages are previewed."""
+        assert _message_preview(str.encode(AIMessage(content="A join combines rows.").model_dump_json())) is None
+
+    @pytest.mark.parametrize("raw", [
+        b"not json",
+        b"\xff\xfe",
+        "",
+        None,
+        b"[1, 2]",
+        b'"hello"',
+        b'{"type": "human", "content": [{"type": "text", "text": "hi"}]}',
+    ])
+    def test_malformed_entries_have_no_preview(self, raw):
+        """Test undecodable or unexpected entries are skipped instead of failing the listing."""
+        assert _message_preview(raw) is None
@@ -0,0 +1,116 @@
+"""Test server-sent event streaming for chat responses."""
+
+import asyncio
+from types import SimpleNamespace
+
+import orjson
+from fastapi import BackgroundTasks
+
+from rag_scholar.routes import rag_chat
+from rag_scholar.routes.rag_chat import SSE_HEADERS, SSE_PING, ChatRequest, _sse_response
+
+
+async def _payloads(*items, delay: float = 0.0):
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+async def _collect(response) -> bytes:
+    return b"".join([chunk async for chunk in response.body_iterator])
+
+
+def _parse_frames(body: bytes) -> list:
+    """Split an event stream into decoded data payloads and raw comment lines."""
+    frames = []
+    for frame in body.decode().split("\n\n"):
+        if not frame:
+            continue
+        if frame.startswith(":"):
+            frames.append(frame)
+        else:
+            assert frame.startswith("data: ")
+            frames.append(orjson.loads(frame[len("data: "):]))
+    return frames
+
+
+class TestSSEResponse:
+    """Test framing, headers and keep-alive pings of _sse_response."""
+
+    def test_frames_decode_back_to_payloads(self):
+        """Test each payload is emitted as one data frame in order."""
+        payloads = [{"type": "token", "content": "Hello\nworld"}, {"type": "done", "sources": ["a.pdf"]}]
+        response = _sse_response(_payloads(*payloads))
+
+        assert _parse_frames(asyncio.run(_collect(response))) == payloads
+
+    def test_response_sets_event_stream_headers(self):
+        """Test the anti-buffering headers and media type are sent."""
+        response = _sse_response(_payloads())
+
+        assert response.media_type == "text/event-stream"
+        for name, value in SSE_HEADERS.items():
+            assert response.headers[name] == value
+
+    def test_idle_stream_sends_ping_comments(self):
+        """Test a ping comment is sent while the source is idle, without losing events."""
+        response = _sse_response(_payloads({"type": "done"}, delay=0.05), ping_interval=0.01)
+        frames = _parse_frames(asyncio.run(_collect(response)))
+
+        assert SSE_PING.decode().strip() in frames
+        assert frames[-1] == {"type": "done"}
+
+
+class _FakeRAGPipeline:
+    def __init__(self, settings):
+        pass
+
+    def fit_context_budget(self, docs):
+        return docs
+
+    async def stream_chat_with_history(self, **kwargs):
+        for chunk in ("Joins ", "combine rows."):
+            yield chunk
+
+    async def _store_session_metadata(self, **kwargs):
+        return "SQL joins"
+
+
+class _FakeIngestionPipeline:
+    def __init__(self, settings):
+        pass
+
+    async def search_documents(self, **kwargs):
+        return [{"source": "a.pdf", "content": "Joins combine rows.", "metadata": {}}]
+
+
+class TestChatStream:
+    """Test chat_stream releases its chat slot before post-processing."""
+
+    def test_semaphore_released_before_done_frame(self, monkeypatch):
+        """Test the done frame is sent with the chat slot already free."""
+        monkeypatch.setattr(rag_chat, "get_settings", lambda: SimpleNamespace(chat_concurrency=1))
+        monkeypatch.setattr(rag_chat, "_build_user_settings", lambda request, settings: settings)
+        monkeypatch.setattr(rag_chat, "LangChainRAGPipeline", _FakeRAGPipeline)
+        monkeypatch.setattr(rag_chat, "LangChainIngestionPipeline", _FakeIngestionPipeline)
+        rag_chat._chat_semaphore.cache_clear()
+
+        async def run():
+            background_tasks = BackgroundTasks()
+            response = await rag_chat.chat_stream(
+                ChatRequest(query="What is a join?"), background_tasks, {"id": "user-1"}
+            )
+            slot_free_at = {}
+            async for frame in response.body_iterator:
+                payload = orjson.loads(frame[len(b"data: "):])
+                slot_free_at[payload["type"]] = not rag_chat._chat_semaphore().locked()
+            return slot_free_at, background_tasks
+
+        try:
+            slot_free_at, background_tasks = asyncio.run(run())
+        finally:
+            rag_chat._chat_semaphore.cache_clear()
+
+        assert slot_free_at == {"token": False, "done": True}
+        assert len(background_tasks.tasks) == 1